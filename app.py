@@ -1,18 +1,15 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
+from uuid import uuid4
 
-from utils.utils import init_vector_store
-from langgraph.graph import END, MessagesState, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from utils.utils import init_vector_store, get_vector_store, get_retriever
+from utils.async_runner import run_async, iterate_async
+from utils.checkpoints import get_checkpointer
 
-from nodes import (
-    get_llm,
-    retrieve_node,
-    tool_node,
-    tool_executor,
-    route_after_tool_choice
-)
+from approval import aapprove, areject, pending_tool_calls
+from graph import build_graph
+from nodes import init_llm_pool
 
 # Page config
 st.set_page_config(
@@ -25,59 +22,89 @@ st.set_page_config(
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
     st.session_state.app = None
-    st.session_state.thread_config = {"configurable": {"thread_id": "1"}}
+    # Each browser session gets its own conversation thread; the id is kept in
+    # the URL so a reload (or a server restart) returns to the same thread
+    if "session" not in st.query_params:
+        st.query_params["session"] = uuid4().hex
+    st.session_state.thread_config = {"configurable": {"thread_id": st.query_params["session"]}}
     st.session_state.messages = []
     st.session_state.pending_approval = False
     st.session_state.pending_tool_calls = None
 
-def initialize_app():
-    """Initialize the LangGraph app"""
-    load_dotenv()
-
-    # Set folder path
-    folder_path = "C:/music_files"
-
-    # Initialize LLM
-    llm = get_llm()
-
-    # Initialize vector store with retriever
-    with st.spinner("Initializing vector store..."):
-        init_vector_store(folder_path=folder_path, llm=llm)
-
-    # Create LangGraph workflow
-    flow = StateGraph(MessagesState)
-
-    # Add nodes
-    flow.add_node("retrieve", retrieve_node)
-    flow.add_node("tool", tool_node)
-    flow.add_node("tool_executor", tool_executor)
+# Heavy resources are built once per process and shared by every session;
+# a session only owns its thread id and chat history.
+FOLDER_PATH = "C:/music_files"
 
-    # Set entry point
-    flow.set_entry_point("retrieve")
-
-    # Add edges
-    flow.add_edge("retrieve", "tool")
+@st.cache_resource(show_spinner=False)
+def load_llm_pool():
+    """LLM client pool (pre-bound tools, warm keep-alive connections)"""
+    load_dotenv()
+    return init_llm_pool()
 
-    # Add conditional edge
-    flow.add_conditional_edges(
-        "tool",
-        route_after_tool_choice,
-        {
-            "tool_executor": "tool_executor",
-            "end": END
-        }
-    )
+@st.cache_resource(show_spinner="Initializing vector store...")
+def load_index(folder_path: str):
+    """Catalog, embeddings, vector store and retriever for folder_path"""
+    init_vector_store(folder_path=folder_path, llm=load_llm_pool().get())
+    return get_vector_store(), get_retriever()
 
-    flow.add_edge("tool_executor", END)
+@st.cache_resource(show_spinner=False)
+def load_graph():
+    """Compiled LangGraph app (async nodes, run on the shared event loop; checkpoints persist across restarts)"""
+    return build_graph(checkpointer=get_checkpointer(), async_mode=True)
 
-    # Compile without checkpointer
-    memory = MemorySaver()
-    app = flow.compile(
-        checkpointer=memory,
-        interrupt_before=["tool_executor"]
+def initialize_app():
+    """Initialize the LangGraph app (instant once another session has built the resources)"""
+    load_llm_pool()
+    load_index(FOLDER_PATH)
+    return load_graph()
+
+def start_session():
+    """Attach this session to the shared app and restore an approval left pending before a restart"""
+    st.session_state.app = initialize_app()
+    st.session_state.initialized = True
+
+    pending = pending_tool_calls(st.session_state.app, st.session_state.thread_config)
+    if pending:
+        st.session_state.pending_approval = True
+        st.session_state.pending_tool_calls = pending
+
+def stream_agent_response(inputs, status, placeholder):
+    """
+    Run the graph with streaming. Node updates are shown in the status box as
+    each node finishes (retrieval count first), and tokens of the tool-selection
+    model are rendered as they arrive. Returns the last message produced.
+    """
+    streamed = ""
+    last_message = None
+
+    stream = st.session_state.app.astream(
+        inputs,
+        st.session_state.thread_config,
+        stream_mode=["updates", "messages"]
     )
-
-    return app
+    for mode, chunk in iterate_async(stream):
+        if mode == "messages":
+            # LLM token chunks; only the tool node talks to the user
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "tool" and isinstance(message.content, str) and message.content:
+                streamed += message.content
+                placeholder.markdown(streamed + "▌")
+            continue
+
+        for node, update in chunk.items():
+            if node.startswith("__") or not update or not update.get("messages"):
+                continue
+            last_message = update["messages"][-1]
+            if node == "retrieve":
+                status.update(label=f"🔍 {last_message.content.splitlines()[0]} · 🤖 Choosing action...")
+                status.markdown(last_message.content)
+            elif node == "tool":
+                if getattr(last_message, "tool_calls", None):
+                    status.update(label="🔧 Tool calls ready for review", state="complete")
+                else:
+                    status.update(label="✅ Done", state="complete")
+
+    return last_message
 
 # Title
 st.title("🎵 Audio Metadata Agent")
@@ -87,25 +114,34 @@ st.markdown("---")
 with st.sidebar:
     st.header("설정")
 
-    if st.button("Initialize Agent (Vector store initialization)", type="primary"):
+    if st.button("Rebuild Index (rescan music folder)", type="primary"):
 
         try:
-            st.session_state.app = initialize_app()
-            st.session_state.initialized = True
-            st.success("Agent initialized successfully!")
+            # Drops the shared index for every session and rebuilds it once
+            load_index.clear()
+            load_index(FOLDER_PATH)
+            st.success("Index rebuilt successfully!")
         except Exception as e:
-            st.error(f"Error initializing agent: {e}")
+            st.error(f"Error rebuilding index: {e}")
 
     if st.button("Clear Chat History"):
+        # Start a new conversation thread
+        st.query_params["session"] = uuid4().hex
+        st.session_state.thread_config = {"configurable": {"thread_id": st.query_params["session"]}}
         st.session_state.messages = []
         st.session_state.pending_approval = False
         st.session_state.pending_tool_calls = None
         st.rerun()
 
-# Main chat interface
+# Attach the session to the shared resources (built on first use only)
 if not st.session_state.initialized:
-    st.info("👈 Please initialize the agent using the sidebar button.")
-else:
+    try:
+        start_session()
+    except Exception as e:
+        st.error(f"Error initializing agent: {e}")
+
+# Main chat interface
+if st.session_state.initialized:
     # Display chat messages
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -125,21 +161,11 @@ else:
         with col1:
             if st.button("✅ Approve", type="primary", use_container_width=True):
                 try:
-                    # Execute the tool
-                    result = st.session_state.app.invoke(None, st.session_state.thread_config)
-
-                    result = st.session_state.app.invoke(
-                        {"messages": []}, 
-                        st.session_state.thread_config
-                    )
-
-                    # 결과에서 마지막 메시지(ToolMessage)를 찾아서 표시
-                    if result and "messages" in result:
-                        tool_message = result["messages"][-1]
-                        # tool_message.content에서 None이 아닌 경우만 표시
-                        content = tool_message.content if tool_message.content else ""
-                        # 간단히 결과만 표시
-                        response_text = content
+                    # Resume once from the interrupt; only tool_executor runs
+                    tool_messages = run_async(aapprove(st.session_state.app, st.session_state.thread_config))
+
+                    if tool_messages:
+                        response_text = "\n\n".join(msg.content for msg in tool_messages if msg.content)
                     else:
                         response_text = "Tool executed successfully, but no result message was returned."
 
@@ -160,24 +186,8 @@ else:
         with col2:
             if st.button("❌ Reject", use_container_width=True):
                 try:
-                    # Instead of rollback, add ToolMessage responses for each tool_call
-                    # This prevents OpenAI API error about missing tool responses
-                    from langchain_core.messages import ToolMessage
-
-                    tool_messages = []
-                    for tool_call in st.session_state.pending_tool_calls:
-                        tool_messages.append(
-                            ToolMessage(
-                                content="Tool execution cancelled by user.",
-                                tool_call_id=tool_call['id']
-                            )
-                        )
-
-                    # Update state with tool cancellation messages
-                    st.session_state.app.update_state(
-                        st.session_state.thread_config,
-                        {"messages": tool_messages}
-                    )
+                    # Answer each tool call with a cancellation (OpenAI requires a response per call)
+                    run_async(areject(st.session_state.app, st.session_state.thread_config))
 
                     # Add cancellation message
                     st.session_state.messages.append({
@@ -209,44 +219,45 @@ else:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Get agent response
+        # Get agent response (streamed: node progress in the status box, model tokens below it)
         with st.chat_message("assistant"):
-            with st.spinner("Processing..."):
-                try:
-                    result = st.session_state.app.invoke(
-                        {"messages": [{"role": "user", "content": prompt}]},
-                        st.session_state.thread_config
-                    )
-
-                    if result and "messages" in result:
-                        last_message = result["messages"][-1]
-
-                        # Check if there are pending tool calls
-                        if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-                            st.session_state.pending_approval = True
-                            st.session_state.pending_tool_calls = last_message.tool_calls
-
-                            response_text = "🔧 Tool calls are pending approval. Please review and approve/reject above."
-                        else:
-                            response_text = last_message.content
-
-                        st.markdown(response_text)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": response_text
-                        })
-
-                    if st.session_state.pending_approval:
-                        st.rerun()
+            status = st.status("🔍 Searching files...", expanded=False)
+            placeholder = st.empty()
+            try:
+                last_message = stream_agent_response(
+                    {"messages": [{"role": "user", "content": prompt}]},
+                    status,
+                    placeholder
+                )
+
+                if last_message is not None:
+                    # Check if there are pending tool calls
+                    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+                        st.session_state.pending_approval = True
+                        st.session_state.pending_tool_calls = last_message.tool_calls
+
+                        response_text = "🔧 Tool calls are pending approval. Please review and approve/reject above."
+                    else:
+                        response_text = last_message.content
 
-                except Exception as e:
-                    error_msg = f"Error: {e}"
-                    st.error(error_msg)
+                    placeholder.markdown(response_text)
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": error_msg
+                        "content": response_text
                     })
 
+                if st.session_state.pending_approval:
+                    st.rerun()
+
+            except Exception as e:
+                status.update(label="Error", state="error")
+                error_msg = f"Error: {e}"
+                st.error(error_msg)
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": error_msg
+                })
+
 # Footer
 st.markdown("---")
 st.markdown("Made with Streamlit and LangGraph")
@@ -0,0 +1,159 @@
+import re
+import threading
+
+from langchain_core.messages import ToolMessage
+
+from utils.audio_tools import apply_metadata_changes, plan_metadata_changes
+from utils.result_sets import resolve_result_set
+
+
+CANCELLED_MESSAGE = "Tool execution cancelled by user."
+
+# Threads whose approval is currently being resumed (guards double submits)
+_resuming = set()
+_resuming_lock = threading.Lock()
+
+
+def pending_tool_calls_from_state(state) -> list[dict]:
+    if "tool_executor" not in (state.next or ()):
+        return []
+    messages = state.values.get("messages", [])
+    return list(getattr(messages[-1], "tool_calls", None) or []) if messages else []
+
+
+def pending_tool_calls(app, config) -> list[dict]:
+    """Tool calls of a thread stopped at the approval interrupt (e.g. before a restart), else []."""
+    return pending_tool_calls_from_state(app.get_state(config))
+
+
+def _claim(config) -> bool:
+    thread_id = config["configurable"]["thread_id"]
+    with _resuming_lock:
+        if thread_id in _resuming:
+            return False
+        _resuming.add(thread_id)
+        return True
+
+
+def _release(config):
+    with _resuming_lock:
+        _resuming.discard(config["configurable"]["thread_id"])
+
+
+def _tool_messages(result, tool_calls: list[dict]) -> list[ToolMessage]:
+    ids = {tool_call["id"] for tool_call in tool_calls}
+    return [m for m in (result or {}).get("messages", []) if m.type == "tool" and m.tool_call_id in ids]
+
+
+def _cancellations(tool_calls: list[dict], reason: str) -> list[ToolMessage]:
+    # Every tool call needs a response, otherwise the next LLM call is rejected
+    return [ToolMessage(content=reason, name=tool_call["name"], tool_call_id=tool_call["id"]) for tool_call in tool_calls]
+
+
+def approve(app, config) -> list[ToolMessage]:
+    """
+    Resume the interrupted run exactly once: only tool_executor runs (no new
+    retrieval or LLM call). Returns the tool messages, or [] if nothing was
+    pending or the same thread is already being resumed.
+    """
+    if not _claim(config):
+        return []
+    try:
+        tool_calls = pending_tool_calls(app, config)
+        if not tool_calls:
+            return []
+        return _tool_messages(app.invoke(None, config), tool_calls)
+    finally:
+        _release(config)
+
+
+async def aapprove(app, config) -> list[ToolMessage]:
+    """Async approve() for graphs built with async_mode."""
+    if not _claim(config):
+        return []
+    try:
+        tool_calls = pending_tool_calls_from_state(await app.aget_state(config))
+        if not tool_calls:
+            return []
+        return _tool_messages(await app.ainvoke(None, config), tool_calls)
+    finally:
+        _release(config)
+
+
+def reject(app, config, reason: str = CANCELLED_MESSAGE) -> list[ToolMessage]:
+    """Answer every pending tool call with a cancellation and close the run without executing it."""
+    tool_calls = pending_tool_calls(app, config)
+    if not tool_calls:
+        return []
+    messages = _cancellations(tool_calls, reason)
+    app.update_state(config, {"messages": messages}, as_node="tool_executor")
+    return messages
+
+
+async def areject(app, config, reason: str = CANCELLED_MESSAGE) -> list[ToolMessage]:
+    """Async reject()."""
+    tool_calls = pending_tool_calls_from_state(await app.aget_state(config))
+    if not tool_calls:
+        return []
+    messages = _cancellations(tool_calls, reason)
+    await app.aupdate_state(config, {"messages": messages}, as_node="tool_executor")
+    return messages
+
+
+def tool_call_footprint(tool_call: dict) -> tuple[set[str], set[str]] | None:
+    """
+    (filepaths, fields) a tool call would write, resolved without writing
+    anything; None when the tool is unknown. Raises ValueError when the call
+    is invalid. Previews write nothing.
+    """
+    name, args = tool_call["name"], tool_call["args"]
+    if name == "apply_metadata_changes":
+        parsed = apply_metadata_changes.args_schema.model_validate(args)
+        plan = plan_metadata_changes(parsed.changes, parsed.result_set, parsed.filter, parsed.fields)
+        if isinstance(plan, str):
+            # The call would fail (e.g. an unknown result_set); never count it as writing nothing
+            raise ValueError(plan)
+        return set(plan), {field for fields in plan.values() for field in fields}
+    if name == "transform_metadata":
+        if args.get("preview", True):
+            return set(), set()
+        filepaths = resolve_result_set(args["result_set"]) if args.get("result_set") else args.get("filepaths") or []
+        return set(filepaths), {args["field"]}
+
+    # Legacy per-field tools: batch_update_[to_same_]<field>_tool / update_<field>_tool
+    match = re.fullmatch(r"(?:batch_)?update_(?:to_same_)?(\w+?)_tool", name)
+    if match is None:
+        return None
+    filepaths = args.get("filepaths") or ([args["filepath"]] if args.get("filepath") else [])
+    return set(filepaths), {match.group(1)}
+
+
+class ApprovalPolicy:
+    """
+    Auto-approval rules for unattended runs: the tool calls of one turn are
+    approved when together they write at most max_files files and only touch
+    the allowed fields (None means no limit).
+    """
+
+    def __init__(self, max_files: int | None = None, fields=None):
+        self.max_files = max_files
+        self.fields = set(fields) if fields else None
+
+    def review(self, tool_calls: list[dict]) -> tuple[bool, str, int]:
+        """Returns (approved, reason, number of files that would be written)."""
+        filepaths, fields = set(), set()
+        for tool_call in tool_calls:
+            try:
+                footprint = tool_call_footprint(tool_call)
+            except Exception as e:
+                return False, f"{tool_call['name']}: {e}", 0
+            if footprint is None:
+                return False, f"unknown tool {tool_call['name']}", 0
+            filepaths |= footprint[0]
+            fields |= footprint[1]
+
+        if self.max_files is not None and len(filepaths) > self.max_files:
+            return False, f"{len(filepaths)} files exceed the limit of {self.max_files}", len(filepaths)
+        if self.fields is not None and not fields <= self.fields:
+            return False, f"fields not allowed: {', '.join(sorted(fields - self.fields))}", len(filepaths)
+        return True, "", len(filepaths)
@@ -0,0 +1,193 @@
+"""
+Headless batch runner: runs a JSONL file of edit jobs through the agent graph
+and decides the approval interrupt with an ApprovalPolicy instead of a human.
+
+Each line is either a natural-language request
+    {"id": "genre-fix", "query": "장르가 Balad인 곡들의 장르를 Ballad로 바꿔줘"}
+or a structured tool call that skips retrieval and tool selection
+    {"id": "y2k", "tool": "apply_metadata_changes", "args": {"filter": {"year": "2000"}, "fields": {"genre": "K-Pop"}}}
+
+Usage:
+    python batch_runner.py jobs.jsonl --max-files 50 --fields genre,year --concurrency 4 --output report.jsonl
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from approval import ApprovalPolicy, aapprove, areject, pending_tool_calls_from_state
+from graph import build_graph
+from nodes import get_llm, init_llm_pool
+from utils.utils import init_vector_store
+
+
+def load_jobs(path: str) -> list[dict]:
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job.setdefault("id", str(line_number))
+            jobs.append(job)
+    return jobs
+
+
+def commit_previews(tool_calls: list[dict]) -> list[dict]:
+    # Nobody reads a preview in a headless run, so transforms are committed directly
+    return [
+        {**tool_call, "args": {**tool_call["args"], "preview": False}}
+        if tool_call["name"] == "transform_metadata" else tool_call
+        for tool_call in tool_calls
+    ]
+
+
+def written_count(tool_messages) -> int:
+    written = 0
+    for message in tool_messages:
+        try:
+            written += json.loads(message.content).get("succeeded", 0)
+        except (ValueError, AttributeError):
+            continue
+    return written
+
+
+async def run_job(app, job: dict, policy: ApprovalPolicy, run_id: str, index: int = 0) -> dict:
+    """Run one job on its own thread and settle its approval interrupt by policy."""
+    # Job ids are not unique (repeated or matching another line's default), the input position is
+    config = {"configurable": {"thread_id": f"batch-{run_id}-{index}-{job['id']}"}}
+    report = {"id": job["id"], "status": "no_action", "reason": "", "files": 0, "written": 0, "results": []}
+    start = time.perf_counter()
+
+    try:
+        if "query" in job:
+            await app.ainvoke({"messages": [{"role": "user", "content": job["query"]}]}, config)
+        elif "tool" in job:
+            tool_call = {"name": job["tool"], "args": job.get("args", {}), "id": f"call_{uuid4().hex[:12]}"}
+            await app.aupdate_state(
+                config,
+                {"messages": [HumanMessage(content=f"batch job {job['id']}"), AIMessage(content="", tool_calls=[tool_call])]},
+                as_node="tool"
+            )
+        else:
+            raise ValueError("job needs either 'query' or 'tool'")
+
+        state = await app.aget_state(config)
+        tool_calls = pending_tool_calls_from_state(state)
+        if not tool_calls:
+            messages = state.values.get("messages", [])
+            report["reason"] = messages[-1].content if messages else ""
+        else:
+            committed = commit_previews(tool_calls)
+            if committed != tool_calls:
+                last_message = state.values["messages"][-1]
+                await app.aupdate_state(config, {"messages": [last_message.model_copy(update={"tool_calls": committed})]}, as_node="tool")
+
+            approved, reason, files = await asyncio.to_thread(policy.review, committed)
+            report["files"] = files
+            if approved:
+                tool_messages = await aapprove(app, config)
+                report["status"] = "approved"
+                report["written"] = written_count(tool_messages)
+                report["results"] = [message.content for message in tool_messages]
+            else:
+                await areject(app, config, reason=f"Rejected by batch policy: {reason}")
+                report["status"] = "rejected"
+                report["reason"] = reason
+    except Exception as e:
+        report["status"] = "error"
+        report["reason"] = str(e)
+
+    report["latency"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+async def run_batch(app, jobs: list[dict], policy: ApprovalPolicy, concurrency: int = 4, on_report=None) -> list[dict]:
+    """Run independent jobs concurrently, at most concurrency at a time, in input order."""
+    run_id = uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index, job):
+        async with semaphore:
+            report = await run_job(app, job, policy, run_id, index)
+        if on_report is not None:
+            on_report(report)
+        return report
+
+    return await asyncio.gather(*(bounded(index, job) for index, job in enumerate(jobs)))
+
+
+def summarize(reports: list[dict], elapsed: float) -> dict:
+    latencies = sorted(report["latency"] for report in reports)
+    by_status = {}
+    for report in reports:
+        by_status[report["status"]] = by_status.get(report["status"], 0) + 1
+    written = sum(report["written"] for report in reports)
+    return {
+        "jobs": len(reports),
+        "by_status": by_status,
+        "files_written": written,
+        "elapsed": round(elapsed, 3),
+        "jobs_per_second": round(len(reports) / elapsed, 3) if elapsed else None,
+        "files_per_second": round(written / elapsed, 3) if elapsed else None,
+        "latency_p50": round(statistics.median(latencies), 3) if latencies else None,
+        "latency_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None,
+    }
+
+
+def print_report(report: dict):
+    line = f"[{report['status']}] {report['id']}  files={report['files']} written={report['written']} latency={report['latency']:.2f}s"
+    if report["reason"]:
+        line += f"  ({report['reason'][:120]})"
+    print(line, flush=True)
+
+
+async def amain(args):
+    load_dotenv()
+
+    init_llm_pool()
+    print("Initializing vector store...")
+    await asyncio.to_thread(init_vector_store, folder_path=args.folder, llm=get_llm())
+
+    # Batch threads are throwaway, so they stay out of the interactive checkpoint store
+    app = build_graph(checkpointer=MemorySaver(), async_mode=True)
+    policy = ApprovalPolicy(
+        max_files=args.max_files,
+        fields=[field.strip() for field in args.fields.split(",") if field.strip()] if args.fields else None
+    )
+    jobs = load_jobs(args.jobs)
+    print(f"Running {len(jobs)} jobs (concurrency {args.concurrency})...")
+
+    start = time.perf_counter()
+    reports = await run_batch(app, jobs, policy, concurrency=args.concurrency, on_report=print_report)
+    summary = summarize(reports, time.perf_counter() - start)
+
+    print("\n" + "="*50)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for report in reports:
+                f.write(json.dumps(report, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"summary": summary}, ensure_ascii=False) + "\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run audio metadata edit jobs without human review.")
+    parser.add_argument("jobs", help="JSONL file with one job per line")
+    parser.add_argument("--folder", default="C:/music_files", help="Music folder to index")
+    parser.add_argument("--max-files", type=int, default=50, help="Auto-approve only turns writing at most this many files")
+    parser.add_argument("--fields", default=None, help="Comma-separated fields that may be written (default: any)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs processed at the same time")
+    parser.add_argument("--output", default=None, help="Write per-job reports and the summary as JSONL")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(amain(parse_args()))
@@ -0,0 +1,51 @@
+from langgraph.graph import END, MessagesState, StateGraph
+
+from nodes import (
+    retrieve_node,
+    tool_node,
+    tool_executor,
+    aretrieve_node,
+    atool_node,
+    atool_executor,
+    route_after_tool_choice
+)
+
+
+def build_graph(checkpointer=None, async_mode: bool = False):
+    """
+    Build and compile the LangGraph workflow shared by the front ends.
+    With async_mode the nodes are coroutines, for use with ainvoke/astream.
+    """
+    flow = StateGraph(MessagesState)
+
+    # Add nodes
+    if async_mode:
+        flow.add_node("retrieve", aretrieve_node)          # Start: search for files
+        flow.add_node("tool", atool_node)                  # Decide which metadata update tool to use
+        flow.add_node("tool_executor", atool_executor)     # Execute tools after human approval
+    else:
+        flow.add_node("retrieve", retrieve_node)
+        flow.add_node("tool", tool_node)
+        flow.add_node("tool_executor", tool_executor)
+
+    # Set entry point to retriever
+    flow.set_entry_point("retrieve")
+
+    # retrieve -> tool (always go to tool after retrieval)
+    flow.add_edge("retrieve", "tool")
+
+    # Either execute the chosen tools (after approval) or end
+    flow.add_conditional_edges(
+        "tool",
+        route_after_tool_choice,
+        {
+            "tool_executor": "tool_executor",
+            "end": END
+        }
+    )
+
+    # After tool execution, end the flow
+    flow.add_edge("tool_executor", END)
+
+    # Interrupt before tool_executor for human approval
+    return flow.compile(checkpointer=checkpointer, interrupt_before=["tool_executor"])
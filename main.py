@@ -1,64 +1,65 @@
+import asyncio
+import getpass
+import os
+
 from dotenv import load_dotenv
 
 from utils.utils import *
 from utils.audio_tools import *
 from utils.audio_tag_editor import *
 
-from langgraph.graph import END, MessagesState, StateGraph
-
+from graph import build_graph
+from utils.checkpoints import get_checkpointer
+from approval import aapprove, areject, pending_tool_calls
 from nodes import (
     get_llm,
-    retrieve_node,
-    tool_node,
-    route_after_tool_choice,
-    tool_executor
+    init_llm_pool
 )
 
-if __name__ == "__main__":
+
+async def review_tool_calls(app, config, tool_calls):
+    """Ask for approval of pending tool calls, then resume or cancel the interrupted run."""
+    print("\n" + "="*50)
+    print("Tool calls detected - Human Review Required:")
+    print("="*50)
+    for tool_call in tool_calls:
+        print(f"\nTool: {tool_call['name']}")
+        print(f"Arguments: {tool_call['args']}")
+
+    approval = (await asyncio.to_thread(input, "\nApprove these tool calls? (yes/no): ")).strip().lower()
+
+    if approval in ['yes', 'y']:
+        # Resume once from the interrupt; only tool_executor runs
+        print("\nExecuting tools...")
+        tool_messages = await aapprove(app, config)
+
+        # Display results after execution
+        print("\n✓ Tools executed.")
+        for msg in tool_messages:
+            print(f"  - Result for [{msg.name}]: {msg.content}")
+    else:
+        print("\nTool execution cancelled.")
+        await areject(app, config)
+
+
+async def amain():
 
     load_dotenv()
 
     # Set folder path
     folder_path = "C:/music_files"
 
-    # Initialize LLM
+    # Initialize LLM client pool (pre-bound tools, warm keep-alive connections)
+    init_llm_pool()
     llm = get_llm()
 
     # Initialize vector store with retriever
     print("Initializing vector store...")
-    init_vector_store(folder_path=folder_path, llm=llm)
+    await asyncio.to_thread(init_vector_store, folder_path=folder_path, llm=llm)
     print("Vector store initialized successfully!")
 
-    # Create LangGraph workflow
-    flow = StateGraph(MessagesState)
-
-    # Add nodes
-    flow.add_node("retriever", retrieve_node)  # Start: search for files
-    flow.add_node("update_tool", tool_node)    # Decide which metadata update tool to use
-    flow.add_node("tool_executor", tool_executor)  # Execute tools after human approval
-
-    # Set entry point to retriever
-    flow.set_entry_point("retriever")
-
-    # retriever -> update_tool (always go to update_tool after retrieval)
-    flow.add_edge("retriever", "update_tool")
-
-    # Conditional routing from human_review
-    # After human approval, either execute tool or end
-    flow.add_conditional_edges(
-        "update_tool",
-        route_after_tool_choice,
-        {
-            "tool_executor": "tool_executor",
-            "end": END
-        }
-    )
-
-    # After tool execution, end the flow
-    flow.add_edge("tool_executor", END)
-
-    # Compile the graph with interrupt before human_review for approval
-    app = flow.compile(interrupt_before=["tool_executor"])
+    # Create LangGraph workflow (async nodes, durable checkpoints, interrupt before tool_executor)
+    app = build_graph(checkpointer=get_checkpointer(), async_mode=True)
 
     # Save graph visualization
     app.get_graph().draw_mermaid_png(output_file_path="graph.png")
@@ -70,10 +71,19 @@ if __name__ == "__main__":
     print("="*50)
     print("Enter your queries (type 'quit' or 'exit' to stop):\n")
 
-    config = {"configurable": {"thread_id": "1"}}
+    # One conversation per user; AGENT_SESSION_ID picks (or resumes) a specific one
+    thread_id = os.getenv("AGENT_SESSION_ID") or f"cli-{getpass.getuser()}"
+    config = {"configurable": {"thread_id": thread_id}}
+
+    # Resume an approval that was still pending when the process last stopped
+    pending = await asyncio.to_thread(pending_tool_calls, app, config)
+    if pending:
+        print("A previous session stopped while waiting for approval.")
+        await review_tool_calls(app, config, pending)
+        print()
 
     while True:
-        user_input = input("You: ").strip()
+        user_input = (await asyncio.to_thread(input, "You: ")).strip()
 
         if user_input.lower() in ['quit', 'exit', 'q']:
             print("Goodbye!")
@@ -85,43 +95,19 @@ if __name__ == "__main__":
         # Invoke the agent
         try:
             # Invoke the workflow
-            result = app.invoke({"messages": [{"role": "user", "content": user_input}]}, config)
+            result = await app.ainvoke({"messages": [{"role": "user", "content": user_input}]}, config)
 
             # Display all messages
             if result and "messages" in result:
-                for msg in result["messages"][1:]:  # Skip user message
+                # Only this turn's messages (the thread keeps earlier turns); skip the user message
+                turn_start = max(i for i, m in enumerate(result["messages"]) if m.type == "human")
+                for msg in result["messages"][turn_start + 1:]:
                     if hasattr(msg, 'content') and msg.content:
                         print(f"\nAgent: {msg.content}")
 
                     # Check if workflow was interrupted (tool calls need approval)
                     if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                        print("\n" + "="*50)
-                        print("Tool calls detected - Human Review Required:")
-                        print("="*50)
-                        for tool_call in msg.tool_calls:
-                            print(f"\nTool: {tool_call['name']}")
-                            print(f"Arguments: {tool_call['args']}")
-
-                        approval = input("\nApprove these tool calls? (yes/no): ").strip().lower()
-
-                        if approval in ['yes', 'y']:
-                            # Continue the workflow after approval (resume from interrupt)
-                            print("\nExecuting tools...")
-                            # Resume from interrupt by passing the previous result
-                            continue_result = app.invoke(None, config)
-
-                            # Display results after execution
-                            if continue_result and "messages" in continue_result:
-                                print("\n✓ Tools executed successfully.")
-                                for msg in continue_result["messages"]:
-                                    if msg.role == 'tool':
-                                        print(f"  - Result for [{msg.name}]: {msg.content}")
-                        else:
-                            print("\nTool execution cancelled.")
-                            app.update_state(
-                                config,
-                                {"messages": [("human", "Tool execution cancelled by user.")]}
-                            )
+                        await review_tool_calls(app, config, msg.tool_calls)
 
                 print()  # Empty line for readability
             else:
@@ -131,3 +117,7 @@ if __name__ == "__main__":
             print(f"\nError: {e}\n")
             import traceback
             traceback.print_exc()
+
+
+if __name__ == "__main__":
+    asyncio.run(amain())
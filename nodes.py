@@ -1,12 +1,20 @@
 import os
+import json
+import asyncio
 from typing import Literal
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import AIMessage, ToolMessage
-from langgraph.prebuilt import ToolNode
 from langgraph.graph import MessagesState
 
+from utils.audio_tag_editor import TagWriteBatch, summarize_write_results
+from utils.llm_pool import LLMPool
+from utils.context_window import count_tokens, expired_turn_messages, fit_messages
+from utils.utils import get_vector_store
+
 from utils.audio_tools import (
     get_filepaths_by_query_with_retriever_tool,
+    apply_metadata_changes,
+    transform_metadata,
     batch_update_artist_tool,
     batch_update_to_same_artist_tool,
     update_title_tool,
@@ -26,8 +34,15 @@ from utils.audio_tools import (
 
 FOLDER_PATH = "C:/music_files"
 
-# Metadata update tools only (excluding retrieval tool)
+# Metadata update tools bound to the LLM: one coalesced multi-field, multi-file tool
+# and one server-side per-file value transform
 metadata_update_tools = [
+    apply_metadata_changes,
+    transform_metadata
+]
+
+# Per-field tools kept executable for existing tool calls (not sent to the LLM)
+legacy_metadata_update_tools = [
     batch_update_artist_tool,
     batch_update_to_same_artist_tool,
     update_title_tool,
@@ -49,62 +64,133 @@ Your job is to update metadata of audio files based on user requests.
 Files are located in: {FOLDER_PATH}
 
 Available metadata update tools:
-- batch_update_artist_tool: Update different artists for multiple files
-- batch_update_to_same_artist_tool: Update same artist for multiple files
-- update_title_tool: Update title of a single file
-- batch_update_album_tool: Update different albums for multiple files
-- batch_update_to_same_album_tool: Update same album for multiple files
-- batch_update_genre_tool: Update different genres for multiple files
-- batch_update_to_same_genre_tool: Update same genre for multiple files
-- batch_update_year_tool: Update different years for multiple files
-- batch_update_to_same_year_tool: Update same year for multiple files
-- update_track_tool: Update track number of a single file
-- update_comment_tool: Update comment of a single file
-- batch_update_comment_tool: Update different comments for multiple files
-- batch_update_album_artist_tool: Update different album artists for multiple files
-- batch_update_to_same_album_artist_tool: Update same album artist for multiple files
+- apply_metadata_changes: Update any fields (title, album, artist, genre, year, track, comment, album_artist) of any files in one call.
+  Use changes=[{{filepath, fields}}] for per-file values, or result_set and/or filter + fields to set the same values on every selected file.
+  Put all edits of one request into a single call.
+- transform_metadata: Compute per-file values on the server from a template (e.g. "{{filename_stem}}", "{{track_number:02d}}")
+  and/or a regex substitution of the current value. Use it instead of listing one value per file.
+  Call it with preview=True first; commit with preview=False once the user agrees.
+
+Retrieval results are registered server-side and referenced by a result_set handle (e.g. rs-1a2b3c4d5e).
+Only a preview of the files is shown; when an edit applies to all retrieved files, pass the result_set handle instead of listing filepaths.
+Listing the previewed filepaths only changes those files, never the rest of the result set. There is no paging tool.
 
 Use these tools only when user explicitly asks to update metadata.
 If retriever can't retrieve any files, inform the user that no files were found.
 """
 
 
-def get_llm():
+RETRIEVE_PREVIEW_SIZE = 10
+
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "4"))
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Turns kept in the thread state; older ones are removed when a new turn starts
+STATE_KEEP_TURNS = int(os.getenv("STATE_KEEP_TURNS", "20"))
+
+llm_pool = None
+
+
+def create_llm(http_client=None, http_async_client=None):
     """Initialize Azure OpenAI LLM"""
     llm = AzureChatOpenAI(
         azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         api_key=os.getenv("AZURE_OPENAI_API_KEY"),
         azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
         api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        temperature=0.0
+        temperature=0.0,
+        http_client=http_client,
+        http_async_client=http_async_client
     )
     return llm
 
 
+def init_llm_pool(size: int = LLM_POOL_SIZE, warm_up: bool = True) -> LLMPool:
+    """Create the process-wide LLM client pool once, pre-binding the update tools."""
+    global llm_pool
+    if llm_pool is None:
+        llm_pool = LLMPool(create_llm, size=size)
+        if warm_up:
+            llm_pool.warm_up(metadata_update_tools, url=os.getenv("AZURE_OPENAI_ENDPOINT"))
+    return llm_pool
+
+
+def get_llm():
+    """Shared Azure OpenAI LLM client from the process-wide pool"""
+    return init_llm_pool().get()
+
+
+def format_retrieval_message(page: dict) -> str:
+    """Retrieval summary for the conversation: total, result_set handle and a short preview."""
+    filepaths = page["filepaths"]
+    if not filepaths:
+        return "검색된 파일이 없습니다."
+    # 철자 보정이 적용된 경우 사용자가 확인할 수 있도록 표시
+    corrections = page.get("corrections") or []
+    return (
+        f"검색된 파일: 총 {page['total']}개 (result_set: {page['result_set']})\n" +
+        "".join(f"※ 검색어 철자 보정: {note} (의도한 값이 아니면 검색어를 수정하세요)\n" for note in corrections) +
+        f"미리보기 ({len(filepaths)}개):\n" +
+        "\n".join([f"- {fp}" for fp in filepaths]) +
+        # 나머지 파일은 대화에 나오지 않으므로 경로를 나열하면 미리보기 파일에만 적용됨
+        (f"\n... 외 {page['total'] - len(filepaths)}개 (목록에 없는 파일은 result_set으로만 지정할 수 있습니다)"
+         if page["total"] > len(filepaths) else "") +
+        "\n\n검색된 파일 전체에 적용하려면 result_set 핸들을 사용하세요." +
+        "\n이 파일들의 메타데이터를 업데이트하려면 어떤 작업을 하시겠습니까?"
+    )
+
+
 def retrieve_node(state: MessagesState):
     """
     Retrieve node that searches for relevant audio files based on user query.
     """
     messages = state["messages"]
     last_message = messages[-1]
+    # A new turn starts here: turns that fell out of retention leave the state
+    expired = expired_turn_messages(messages, STATE_KEEP_TURNS)
 
     try:
-        # Use retrieval tool to find relevant files
-        filepaths = get_filepaths_by_query_with_retriever_tool.invoke({"query": last_message.content})
+        # Use retrieval tool to find relevant files; the full result stays server-side
+        page = get_filepaths_by_query_with_retriever_tool.invoke(
+            {"query": last_message.content, "page_size": RETRIEVE_PREVIEW_SIZE}
+        )
+        return {"messages": expired + [AIMessage(content=format_retrieval_message(page))]}
+    except Exception as e:
+        return {"messages": expired + [AIMessage(content=f"검색 중 오류 발생: {str(e)}")]}
 
-        # Format results with instruction for next step
-        if filepaths:
-            result_message = (
-                f"검색된 파일들 ({len(filepaths)}개):\n" +
-                "\n".join([f"- {fp}" for fp in filepaths]) +
-                f"\n\n이 파일들의 메타데이터를 업데이트하려면 어떤 작업을 하시겠습니까?"
-            )
-        else:
-            result_message = "검색된 파일이 없습니다."
 
-        return {"messages": [AIMessage(content=result_message)]}
+async def aretrieve_node(state: MessagesState):
+    """
+    Async retrieve node: awaits the retriever (query constructor and embeddings)
+    instead of blocking the event loop.
+    """
+    messages = state["messages"]
+    last_message = messages[-1]
+    # A new turn starts here: turns that fell out of retention leave the state
+    expired = expired_turn_messages(messages, STATE_KEEP_TURNS)
+
+    try:
+        page = await get_filepaths_by_query_with_retriever_tool.ainvoke(
+            {"query": last_message.content, "page_size": RETRIEVE_PREVIEW_SIZE}
+        )
+        return {"messages": expired + [AIMessage(content=format_retrieval_message(page))]}
     except Exception as e:
-        return {"messages": [AIMessage(content=f"검색 중 오류 발생: {str(e)}")]}
+        return {"messages": expired + [AIMessage(content=f"검색 중 오류 발생: {str(e)}")]}
+
+
+def build_prompt(messages: list) -> list:
+    """
+    System message plus the conversation, trimmed to PROMPT_TOKEN_BUDGET.
+    The latest turn stays verbatim; older turns collapse into summaries that
+    keep their result_set handles instead of path lists.
+    """
+    budget = PROMPT_TOKEN_BUDGET - count_tokens(SYSTEM_MESSAGE)
+    summary, recent = fit_messages(messages, budget)
+
+    prompt = [{"role": "system", "content": SYSTEM_MESSAGE}]
+    if summary:
+        prompt.append({"role": "system", "content": summary})
+    return prompt + recent
 
 
 def tool_node(state: MessagesState):
@@ -112,19 +198,25 @@ def tool_node(state: MessagesState):
     Tool node that decides which metadata update tool to call.
     LLM analyzes user request and previous messages to select appropriate tool.
     """
-    llm = get_llm()
-    llm_with_tools = llm.bind_tools(metadata_update_tools)
+    llm_with_tools = init_llm_pool().get_bound(metadata_update_tools)
 
-    messages = state["messages"]
-
-    # Add system message for context
-    messages_with_system = [{"role": "system", "content": SYSTEM_MESSAGE}] + messages
+    # Add system message for context (history trimmed to the token budget)
+    messages_with_system = build_prompt(state["messages"])
 
     # Call LLM to decide which tool to use
     response = llm_with_tools.invoke(messages_with_system)
 
     return {"messages": [response]}
 
+async def atool_node(state: MessagesState):
+    """Async tool node: same prompt as tool_node, awaited on the pooled async HTTP client."""
+    llm_with_tools = init_llm_pool().get_bound(metadata_update_tools)
+
+    messages_with_system = build_prompt(state["messages"])
+    response = await llm_with_tools.ainvoke(messages_with_system)
+
+    return {"messages": [response]}
+
 def route_after_tool_choice(state: MessagesState) -> Literal["tool_executor", "end"]:
     """
     Router: Checks for tool calls in the last message to decide the next step.
@@ -139,5 +231,52 @@ def route_after_tool_choice(state: MessagesState) -> Literal["tool_executor", "e
         return "end"
 
 
-# Create tool execution node
-tool_executor = ToolNode(metadata_update_tools)
+tools_by_name = {t.name: t for t in metadata_update_tools + legacy_metadata_update_tools}
+
+
+def format_write_results(filepaths, results) -> str:
+    """Summarize per-file TagWriteBatch results for one tool call."""
+    summary = summarize_write_results([results[fp] for fp in filepaths])
+    return json.dumps(summary, ensure_ascii=False)
+
+
+def tool_executor(state: MessagesState):
+    """
+    Tool execution node. All tool calls of the last AI message are run against
+    one TagWriteBatch, so every file is opened and saved exactly once even when
+    several calls change different fields of the same files.
+    """
+    last_message = state["messages"][-1]
+    batch = TagWriteBatch(get_vector_store())
+
+    outputs = {}
+    for tool_call in last_message.tool_calls:
+        selected_tool = tools_by_name.get(tool_call["name"])
+        if selected_tool is None:
+            outputs[tool_call["id"]] = f"[오류] 알 수 없는 도구입니다: {tool_call['name']}"
+            continue
+        with batch.collect(owner=tool_call["id"]):
+            try:
+                outputs[tool_call["id"]] = selected_tool.invoke(tool_call["args"])
+            except Exception as e:
+                outputs[tool_call["id"]] = f"[오류] {tool_call['name']}: {e}"
+
+    results = batch.commit()
+
+    messages = []
+    for tool_call in last_message.tool_calls:
+        filepaths = batch.owned_by(tool_call["id"])
+        output = outputs[tool_call["id"]]
+        if filepaths:
+            content = format_write_results(filepaths, results)
+        else:
+            # Previews and messages reach the model as JSON, like write results
+            content = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+        messages.append(ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"]))
+
+    return {"messages": messages}
+
+
+async def atool_executor(state: MessagesState):
+    """Async tool execution node: the coalesced tag writes run in a worker thread."""
+    return await asyncio.to_thread(tool_executor, state)
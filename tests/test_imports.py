@@ -0,0 +1,18 @@
+import importlib
+
+import pytest
+
+
+# Module-level mistakes (names used before they are defined, bad imports) only show up on import
+@pytest.mark.parametrize("module", [
+    "utils.audio_tag_editor",
+    "utils.audio_tools",
+    "utils.utils",
+    "nodes",
+    "graph",
+    "approval",
+    "batch_runner",
+    "main",
+])
+def test_module_imports(module):
+    importlib.import_module(module)
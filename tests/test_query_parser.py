@@ -0,0 +1,38 @@
+import pytest
+from langchain_core.structured_query import Comparator, Comparison, Operation, Operator
+
+from utils.query_parser import parse_query
+
+
+def eq(field, value):
+    return Comparison(comparator=Comparator.EQ, attribute=field, value=value)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("genre Pop", eq("genre", "Pop")),
+    ("artist is BTS", eq("artist", "BTS")),
+    ("songs by IU", eq("artist", "IU")),
+    ("아티스트가 아이유인 곡", eq("artist", "아이유")),
+    ("artist Simon and Garfunkel", eq("artist", "Simon and Garfunkel")),
+    ('title "Love Me Like You Do"', eq("title", "Love Me Like You Do")),
+    ("genre Pop or genre Rock", Operation(operator=Operator.OR, arguments=[eq("genre", "Pop"), eq("genre", "Rock")])),
+    ("change the genre of artist IU to Pop", eq("artist", "IU")),
+    ("artist IU and genre Ballad", Operation(operator=Operator.AND, arguments=[eq("artist", "IU"), eq("genre", "Ballad")])),
+])
+def test_parses_supported_shapes(query, expected):
+    assert parse_query(query).filter == expected
+
+
+@pytest.mark.parametrize("query", [
+    "genre Pop or Rock",
+    "artist IU or BTS",
+    "artist is not BTS",
+    "title contains love",
+    "title like love",
+    "songs by IU released after 2015",
+    "album from 2015",
+    "아티스트가 아이유가 아닌 곡",
+    "제목에 사랑이 포함된 곡",
+])
+def test_returns_none_for_unsupported_queries(query):
+    assert parse_query(query) is None
@@ -0,0 +1,60 @@
+import asyncio
+import queue
+import threading
+
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    One long-lived event loop on a background thread, shared by every caller in
+    the process. Async clients (httpx pools) stay bound to a single loop, and
+    synchronous front ends can still run coroutines concurrently on it.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True).start()
+    return _loop
+
+
+def run_async(coroutine):
+    """Run a coroutine on the shared loop from synchronous code and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iterate_async(async_iterable):
+    """
+    Iterate an async iterable (e.g. graph.astream) on the shared loop from
+    synchronous code, yielding each item as soon as it is produced.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        except BaseException as e:
+            items.put(_Failed(e))
+        finally:
+            items.put(_DONE)
+
+    asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    while True:
+        item = items.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _Failed):
+            raise item.error
+        yield item
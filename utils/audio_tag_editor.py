@@ -1,80 +1,300 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
+from typing import Iterable, Iterator
 from mutagen.easyid3 import EasyID3
 from uuid import uuid4
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 from mutagen.easymp4 import EasyMP4
 
+from utils.tag_catalog import TagCatalog, file_stat, get_catalog
+from utils.metadata_index import get_metadata_index
+from utils.fuzzy_index import get_fuzzy_index
+from utils.locks import file_locks, index_lock
+
+
+# 태그 키 -> 메타데이터 필드
+TAG_FIELDS = {
+    "title": "title",
+    "album": "album",
+    "artist": "artist",
+    "genre": "genre",
+    "date": "year",
+    "tracknumber": "track",
+    "comment": "comment",
+    "albumartist": "album_artist",
+}
+
+# 메타데이터 필드 -> 태그 키
+FIELD_TAGS = {field: tag_key for tag_key, field in TAG_FIELDS.items()}
+
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_FILE_TIMEOUT = float(os.getenv("BATCH_FILE_TIMEOUT", "30"))
+
+VECTOR_STORE_PATH = ".cache/chroma"
+COLLECTION_NAME = "audio_metadata"
+
+
+def empty_metadata(filepath: str) -> dict:
+    # 기본값은 None
+    metadata = {"filepath": filepath}
+    for field in TAG_FIELDS.values():
+        metadata[field] = None
+    return metadata
+
+
+def read_metadata(filepath: str) -> dict:
+    """Read the tags of a single audio file into a metadata record."""
+    metadata = empty_metadata(filepath)
+    ext = Path(filepath).suffix.lower()
+
+    try:
+        if ext == ".mp3":
+            tag = EasyID3(filepath)
+        elif ext == ".m4a":
+            tag = EasyMP4(filepath)
+        else:
+            return metadata
+
+        for tag_key, field in TAG_FIELDS.items():
+            metadata[field] = tag.get(tag_key, [None])[0]
+
+    except Exception as e:
+        # 오류 발생 시 기본값 그대로 유지
+        print(f"[오류] {filepath}: {e}")
+
+    return metadata
+
+
+def list_audio_files(folder_path: str) -> list[str]:
+    """List the files directly under folder_path (resolved absolute paths)."""
+    with os.scandir(folder_path) as entries:
+        return [str(Path(entry.path).resolve()) for entry in entries if entry.is_file()]
+
+
+def iter_metadata(filepaths: Iterable[str], max_workers: int = 8, max_pending: int | None = None) -> Iterator[dict]:
+    """
+    Read tags on a bounded thread pool and yield metadata records as they complete.
+    At most max_pending reads are in flight, so a slow consumer holds back the scan
+    instead of letting finished records pile up in memory.
+    """
+    max_pending = max_pending or max_workers * 4
+    filepaths = iter(filepaths)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tag-scan") as executor:
+        pending = set()
+        for filepath in filepaths:
+            pending.add(executor.submit(read_metadata, filepath))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def iter_metadata_from_folder(folder_path: str, max_workers: int = 8, max_pending: int | None = None) -> Iterator[dict]:
+    """Streaming, parallel version of return_metadata_from_folder."""
+    yield from iter_metadata(list_audio_files(folder_path), max_workers=max_workers, max_pending=max_pending)
+
 
 def return_metadata_from_folder(folder_path: str) -> list[dict]:
-    result = []
-    for file in Path(folder_path).iterdir():
-        if file.is_file():
-            filepath = str(file.resolve())
-            ext = file.suffix.lower()
-
-            # 기본값은 None
-            metadata = {
-                "filepath": filepath,
-                "title": None,
-                "album": None, 
-                "artist": None,
-                "genre": None,
-                "year": None,
-                "track": None,
-                "comment": None,
-                "album_artist": None,
-            }
-
-            try:
-                if ext == ".mp3":
-                    tag = EasyID3(filepath)
-                    metadata["title"] = tag.get("title", [None])[0]
-                    metadata["album"] = tag.get("album", [None])[0]
-                    metadata["artist"] = tag.get("artist", [None])[0]
-                    metadata["genre"] = tag.get("genre", [None])[0]
-                    metadata["year"] = tag.get("date", [None])[0]
-                    metadata["track"] = tag.get("tracknumber", [None])[0]
-                    metadata["comment"] = tag.get("comment", [None])[0]
-                    metadata["album_artist"] = tag.get("albumartist", [None])[0]
-
-                elif ext == ".m4a":
-                    tag = EasyMP4(filepath)
-                    metadata["title"] = tag.get("title", [None])[0]
-                    metadata["album"] = tag.get("album", [None])[0]
-                    metadata["artist"] = tag.get("artist", [None])[0]
-                    metadata["genre"] = tag.get("genre", [None])[0]
-                    metadata["year"] = tag.get("date", [None])[0]
-                    metadata["track"] = tag.get("tracknumber", [None])[0]
-                    metadata["comment"] = tag.get("comment", [None])[0]
-                    metadata["album_artist"] = tag.get("albumartist", [None])[0]
-
-            except Exception as e:
-                # 오류 발생 시 기본값 그대로 유지
-                print(f"[오류] {filepath}: {e}")
-
-            result.append(metadata)
-        
-    return result
-
-def store_metadata_in_vector_store(folder_path: str, embeddings) -> Chroma:
-    metadata_list = return_metadata_from_folder(folder_path)
-    documents = []
+    return list(iter_metadata_from_folder(folder_path))
 
-    for metadata in metadata_list:
-        file_path = metadata["filepath"]
-        content = (
-            f"Audio file metadata for: {file_path}"
-        )
-        
-        document = Document(page_content=content, metadata=metadata, id=f"{file_path}")
-        documents.append(document)
-        print(document)
 
-    vector_store = Chroma.from_documents(documents=documents, embedding=embeddings)
-    print(f"메타데이터를 벡터 스토어에 저장했습니다. 문서 수: {len(documents)}")
+def iter_sync_catalog(catalog: TagCatalog, folder_path: str, max_workers: int = 8) -> Iterator[dict]:
+    """
+    Bring the catalog in line with folder_path like sync_catalog, yielding
+    every current record: new or modified files first, as the scanner reads
+    them (a slow consumer such as index_metadata holds the scan back), then
+    the unchanged ones from the catalog.
+    """
+    current = {}
+    for filepath in list_audio_files(folder_path):
+        try:
+            current[filepath] = file_stat(filepath)
+        except OSError as e:
+            print(f"[오류] {filepath}: {e}")
+
+    changed, deleted = catalog.diff(current)
+    catalog.delete(deleted)
+
+    records = []
+    for metadata in iter_metadata(changed, max_workers=max_workers):
+        records.append(metadata)
+        if len(records) >= 500:
+            catalog.upsert(records, current)
+            records = []
+        yield metadata
+    catalog.upsert(records, current)
+
+    print(f"카탈로그 동기화: 변경 {len(changed)}개, 삭제 {len(deleted)}개, 전체 {len(current)}개")
+    changed = set(changed)
+    for record in catalog.records():
+        if record["filepath"] not in changed:
+            yield record
+
+
+def sync_catalog(catalog: TagCatalog, folder_path: str, max_workers: int = 8) -> list[dict]:
+    """
+    Bring the catalog in line with folder_path: re-read tags only for new or
+    modified files (by mtime/size), drop deleted files, and return all records.
+    """
+    for _ in iter_sync_catalog(catalog, folder_path, max_workers=max_workers):
+        pass
+    return catalog.records()
+
+
+# 태그 수정이나 인덱스 재구성마다 증가 (검색 결과 캐시 무효화용)
+_write_generation = 0
+
+
+def get_write_generation() -> int:
+    return _write_generation
+
+
+def bump_write_generation():
+    """Mark every cached search result stale; call with index_lock held for writing."""
+    global _write_generation
+    _write_generation += 1
+
+
+def write_through(filepath: str, fields: dict):
+    """Reflect a saved tag edit in the catalog and lookup indexes, if initialized."""
+    with index_lock.write():
+        bump_write_generation()
+        catalog = get_catalog()
+        if catalog is not None:
+            catalog.update_fields(filepath, fields)
+        metadata_index = get_metadata_index()
+        if metadata_index is not None:
+            metadata_index.update(filepath, fields)
+        fuzzy_index = get_fuzzy_index()
+        if fuzzy_index is not None:
+            for field, value in fields.items():
+                fuzzy_index.add(field, value)
+
+
+def store_metadata_in_vector_store(folder_path: str, embeddings, metadata_list: list[dict] | None = None) -> Chroma:
+    if metadata_list is None:
+        metadata_list = iter_metadata_from_folder(folder_path)
+
+    vector_store = Chroma(embedding_function=embeddings)
+    count = index_metadata(vector_store, metadata_list)
+    print(f"메타데이터를 벡터 스토어에 저장했습니다. 문서 수: {count}")
     return vector_store
 
+
+def metadata_to_document(metadata: dict) -> Document:
+    file_path = metadata["filepath"]
+    content = f"Audio file metadata for: {file_path}"
+    return Document(page_content=content, metadata=metadata, id=f"{file_path}")
+
+
+def open_vector_store(embeddings, persist_directory: str = VECTOR_STORE_PATH, collection_name: str = COLLECTION_NAME) -> Chroma:
+    """Open (or create) the persisted Chroma collection for audio metadata."""
+    Path(persist_directory).mkdir(parents=True, exist_ok=True)
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+    )
+
+
+def _comparable(metadata: dict) -> dict:
+    # Chroma은 None 값을 저장하지 않으므로 비교 전에 제거
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def index_metadata(vector_store: Chroma, metadata_list: Iterable[dict], batch_size: int = 64, max_in_flight: int = 4) -> int:
+    """
+    Embed and upsert metadata records in batches of batch_size, with at most
+    max_in_flight embedding requests outstanding. metadata_list is consumed
+    lazily: a new batch is only pulled once a slot frees up, so a streaming
+    scanner is held back instead of buffering the whole library.
+    """
+    embeddings = vector_store.embeddings
+    collection = vector_store._collection
+    indexed = 0
+
+    def embed(batch: list[Document]):
+        return batch, embeddings.embed_documents([doc.page_content for doc in batch])
+
+    def write(future):
+        nonlocal indexed
+        batch, vectors = future.result()
+        collection.upsert(
+            ids=[doc.id for doc in batch],
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch],
+        )
+        indexed += len(batch)
+        print(f"인덱싱 진행: {indexed}개")
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed") as executor:
+        pending = set()
+        batch = []
+        for metadata in metadata_list:
+            batch.append(metadata_to_document(metadata))
+            if len(batch) < batch_size:
+                continue
+            pending.add(executor.submit(embed, batch))
+            batch = []
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future)
+        if batch:
+            pending.add(executor.submit(embed, batch))
+        for future in as_completed(pending):
+            write(future)
+
+    return indexed
+
+
+def sync_vector_store(vector_store: Chroma, metadata_list: Iterable[dict], batch_size: int = 64, max_in_flight: int = 4) -> dict:
+    """
+    Diff the current library against the ids stored in vector_store: add new
+    documents, update the ones whose metadata changed and delete vanished ones.
+    """
+    stored = vector_store.get(include=["metadatas"])
+    stored_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+
+    current_ids = set()
+    counts = {"added": 0}
+    # 문서 내용은 경로에만 의존하므로 변경된 문서는 메타데이터만 갱신 (재임베딩 없음)
+    patches = {}
+
+    def added():
+        for metadata in metadata_list:
+            doc_id = metadata["filepath"]
+            current_ids.add(doc_id)
+            if doc_id not in stored_metadata:
+                counts["added"] += 1
+                yield metadata
+            elif _comparable(stored_metadata[doc_id] or {}) != _comparable(metadata):
+                patches[doc_id] = metadata
+
+    index_metadata(vector_store, added(), batch_size=batch_size, max_in_flight=max_in_flight)
+    patch_vector_store_metadata(vector_store, patches)
+    counts["updated"] = len(patches)
+
+    deleted = [doc_id for doc_id in stored_metadata if doc_id not in current_ids]
+    for i in range(0, len(deleted), 1000):
+        vector_store.delete(ids=deleted[i:i + 1000])
+
+    counts["deleted"] = len(deleted)
+    counts["total"] = len(current_ids)
+    print(f"벡터 스토어 동기화: 추가 {counts['added']}개, 수정 {counts['updated']}개, 삭제 {counts['deleted']}개, 전체 {counts['total']}개")
+    return counts
+
+
 def store_page_content_in_vector_store(folder_path: str, embeddings) -> Chroma:
     metadata_list = return_metadata_from_folder(folder_path)
 
@@ -111,210 +331,270 @@ def store_page_content_in_vector_store(folder_path: str, embeddings) -> Chroma:
 
     return vector_store, documents
 
+def open_tags(filepath: str):
+    """Open the easy tag interface for filepath, or None for unsupported formats."""
+    ext = Path(filepath).suffix.lower()
+    if ext == ".mp3":
+        return EasyID3(filepath)
+    if ext == ".m4a":
+        return EasyMP4(filepath)
+    return None
+
+
+def patch_vector_store_metadata(vector_store, patches: dict[str, dict], batch_size: int = 5000):
+    """
+    Merge changed fields into the existing Chroma records of {filepath: fields}.
+    Only metadata is sent, so stored embeddings and documents are left untouched
+    and nothing is re-embedded; one store call per batch_size records.
+    """
+    ids = list(patches)
+    with index_lock.write():
+        for i in range(0, len(ids), batch_size):
+            chunk = ids[i:i + batch_size]
+            vector_store._collection.update(ids=chunk, metadatas=[patches[doc_id] for doc_id in chunk])
+
+
+def save_file_tags(filepath: str, fields: dict) -> bool:
+    """
+    Open filepath once, set every field in fields, save once and reflect the
+    change in the catalog. Returns False for unsupported formats. Writes to
+    the same file from concurrent sessions are serialized.
+    """
+    with file_locks.hold(filepath):
+        tag = open_tags(filepath)
+        if tag is None:
+            return False
+        for field, value in fields.items():
+            tag[FIELD_TAGS[field]] = value
+        tag.save(filepath)
+        write_through(filepath, fields)
+    return True
+
+
+def save_tags(vector_store, filepath: str, fields: dict) -> bool:
+    """save_file_tags for a single file, followed by its vector store patch."""
+    if not save_file_tags(filepath, fields):
+        return False
+    patch_vector_store_metadata(vector_store, {filepath: fields})
+    return True
+
+
+def save_tags_bulk(vector_store, changes, max_workers: int = BATCH_MAX_WORKERS, timeout: float | None = BATCH_FILE_TIMEOUT) -> list[dict]:
+    """
+    Write (filepath, fields) changes on the worker pool, then patch the vector
+    store metadata of every successfully written file in one bulk call. Files
+    that time out are patched on their own if their write completes later.
+    """
+    changes = dict(changes)
+
+    def patch_late(filepath, ok):
+        # A timed-out write that still saved has already reached the catalog; keep Chroma in step
+        if ok:
+            patch_vector_store_metadata(vector_store, {filepath: changes[filepath]})
+
+    results = run_per_file(save_file_tags, changes.items(), max_workers=max_workers, timeout=timeout, on_late_result=patch_late)
+    patches = {result["filepath"]: changes[result["filepath"]] for result in results if result["ok"]}
+    if patches:
+        patch_vector_store_metadata(vector_store, patches)
+    return results
+
+
+def run_per_file(fn, items, max_workers: int = BATCH_MAX_WORKERS, timeout: float | None = BATCH_FILE_TIMEOUT,
+                 on_late_result=None) -> list[dict]:
+    """
+    Run fn(filepath, value) for each (filepath, value) on a bounded worker pool.
+    fn returns False for unsupported formats and raises on failure. A file whose
+    write runs longer than timeout seconds is reported as not ok with an
+    unknown outcome: the worker thread cannot be interrupted and may still
+    finish, in which case on_late_result(filepath, ok) is called from that
+    thread. Duplicate filepaths keep the last value.
+    Returns [{"filepath", "ok", "error"}] in input order.
+    """
+    items = dict(items)
+    results = {}
+    started = {}
+
+    def run(filepath, value):
+        started[filepath] = time.monotonic()
+        return fn(filepath, value)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tag-write")
+    try:
+        futures = {executor.submit(run, filepath, value): filepath for filepath, value in items.items()}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1 if timeout else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                filepath = futures[future]
+                try:
+                    if future.result():
+                        results[filepath] = {"filepath": filepath, "ok": True, "error": None}
+                    else:
+                        results[filepath] = {"filepath": filepath, "ok": False, "error": "지원하지 않는 파일 형식입니다"}
+                except Exception as e:
+                    results[filepath] = {"filepath": filepath, "ok": False, "error": str(e)}
+
+            if timeout:
+                now = time.monotonic()
+                for future in list(pending):
+                    filepath = futures[future]
+                    if filepath in started and now - started[filepath] > timeout:
+                        pending.discard(future)
+                        results[filepath] = {
+                            "filepath": filepath, "ok": False,
+                            "error": f"시간 초과 ({timeout}초): 결과 미확정, 늦게 완료되면 저장 내용이 반영됩니다"
+                        }
+                        if on_late_result is not None:
+                            future.add_done_callback(lambda f, filepath=filepath: _report_late_result(f, filepath, on_late_result))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [results[filepath] for filepath in items]
+
+
+def _report_late_result(future, filepath: str, on_late_result):
+    try:
+        ok = not future.cancelled() and future.exception() is None and bool(future.result())
+        on_late_result(filepath, ok)
+    except Exception as e:
+        print(f"[오류] {filepath}: 지연된 쓰기 결과 반영 실패: {e}")
+
+
+def summarize_write_results(results: list[dict]) -> dict:
+    failures = [{"filepath": result["filepath"], "error": result["error"]} for result in results if not result["ok"]]
+    return {
+        "total": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+    }
+
+
+_active_write_batch = ContextVar("active_write_batch", default=None)
+
+
+def get_active_write_batch():
+    return _active_write_batch.get()
+
+
+class TagWriteBatch:
+    """
+    Collects field changes per file across several update calls and applies
+    them at commit, opening and saving each file exactly once.
+    """
+
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self._changes = {}  # filepath -> {field: value}
+        self._owners = {}  # owner -> [filepath, ...]
+        self._owner = None
+
+    def set(self, filepath: str, field: str, value):
+        self.set_many(filepath, {field: value})
+
+    def set_many(self, filepath: str, fields: dict):
+        self._changes.setdefault(filepath, {}).update(fields)
+        if self._owner is not None:
+            self._owners.setdefault(self._owner, []).append(filepath)
+
+    def owned_by(self, owner) -> list[str]:
+        """Filepaths changed while owner was current, in first-change order."""
+        return list(dict.fromkeys(self._owners.get(owner, [])))
+
+    @contextmanager
+    def collect(self, owner=None):
+        """While active, update_* calls queue into this batch instead of writing."""
+        previous_owner = self._owner
+        self._owner = owner
+        token = _active_write_batch.set(self)
+        try:
+            yield self
+        finally:
+            _active_write_batch.reset(token)
+            self._owner = previous_owner
+
+    def __len__(self):
+        return len(self._changes)
+
+    def commit(self, max_workers: int = BATCH_MAX_WORKERS, timeout: float | None = BATCH_FILE_TIMEOUT) -> dict[str, dict]:
+        """
+        Apply all queued changes on a bounded worker pool, one open/save per file.
+        Returns {filepath: {"filepath", "ok", "error"}}.
+        """
+        changes, self._changes = self._changes, {}
+        results = save_tags_bulk(self.vector_store, changes.items(), max_workers=max_workers, timeout=timeout)
+        return {result["filepath"]: result for result in results}
+
+
+def write_tags(vector_store, filepath: str, fields: dict) -> bool:
+    """Queue into the active TagWriteBatch if there is one, otherwise save immediately."""
+    batch = get_active_write_batch()
+    if batch is not None:
+        batch.set_many(filepath, fields)
+        return True
+    return save_tags(vector_store, filepath, fields)
+
+
 def update_title(vector_store, filepath: str, title: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['title'] = title
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"title": title})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['title'] = title
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"title": title})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"title": title}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"제목을 '{title}'로 업데이트했습니다: {filepath}"
     except Exception as e:
-        return f"[오류] 제목 업데이트 실패 - {filepath}: {e}"    
+        return f"[오류] 제목 업데이트 실패 - {filepath}: {e}"
 
 def update_album(vector_store, filepath: str, album: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['album'] = album
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"album": album})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['album'] = album
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"album": album})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"album": album}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
-        return f"제목을 '{album}'로 업데이트했습니다: {filepath}"
+        return f"앨범을 '{album}'로 업데이트했습니다: {filepath}"
     except Exception as e:
-        return f"[오류] 제목 업데이트 실패 - {filepath}: {e}"
-    
+        return f"[오류] 앨범 업데이트 실패 - {filepath}: {e}"
+
 def update_artist(vector_store, filepath: str, artist: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['artist'] = artist
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"artist": artist})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['artist'] = artist
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"artist": artist})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"artist": artist}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
-        return vector_store
+        return f"아티스트를 '{artist}'로 업데이트했습니다: {filepath}"
     except Exception as e:
         return f"[오류] 아티스트 업데이트 실패 - {filepath}: {e}"
 
 def update_genre(vector_store, filepath: str, genre: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['genre'] = genre
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"genre": genre})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['genre'] = genre
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"genre": genre})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"genre": genre}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"장르를 '{genre}'로 업데이트했습니다: {filepath}"
     except Exception as e:
         return f"[오류] 장르 업데이트 실패 - {filepath}: {e}"
 
 def update_year(vector_store, filepath: str, year: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['date'] = year
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"year": year})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['date'] = year
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"year": year})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"year": year}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"연도를 '{year}'로 업데이트했습니다: {filepath}"
     except Exception as e:
         return f"[오류] 연도 업데이트 실패 - {filepath}: {e}"
 
 def update_track(vector_store, filepath: str, track: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['tracknumber'] = track
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"track": track})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['tracknumber'] = track  # 예: 3 -> (3, 0)
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"track": track})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"track": track}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"트랙 번호를 '{track}'으로 업데이트했습니다: {filepath}"
     except Exception as e:
         return f"[오류] 트랙 번호 업데이트 실패 - {filepath}: {e}"
 
 def update_comment(vector_store, filepath: str, comment: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['comment'] = comment
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"comment": comment})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['comment'] = comment
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"comment": comment})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"comment": comment}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"코멘트를 '{comment}'로 업데이트했습니다: {filepath}"
     except Exception as e:
         return f"[오류] 코멘트 업데이트 실패 - {filepath}: {e}"
 
 def update_album_artist(vector_store, filepath: str, album_artist: str) -> str:
-    path = Path(filepath)
-    ext = path.suffix.lower()
     try:
-        if ext == ".mp3":
-            tag = EasyID3(filepath)
-            tag['albumartist'] = album_artist
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"album_artist": album_artist})
-                ,document_id=f"{filepath}")
-        elif ext == ".m4a":
-            tag = EasyMP4(filepath)
-            tag['albumartist'] = album_artist
-            tag.save(filepath)
-            vector_store.update_document(
-                document=Document(page_content="page_content", 
-                                  metadata={"album_artist": album_artist})
-                ,document_id=f"{filepath}")
-        else:
+        if not write_tags(vector_store, filepath, {"album_artist": album_artist}):
             return f"지원하지 않는 파일 형식입니다: {filepath}"
         return f"앨범 아티스트를 '{album_artist}'로 업데이트했습니다: {filepath}"
     except Exception as e:
-        return f"[오류] 앨범 아티스트 업데이트 실패 - {filepath}: {e}"
\ No newline at end of file
+        return f"[오류] 앨범 아티스트 업데이트 실패 - {filepath}: {e}"
@@ -1,25 +1,377 @@
 from utils.audio_tag_editor import *
 from utils.utils import *
 
-from langchain_core.tools import tool
-from typing import List
+import asyncio
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
 
+from langchain_core.structured_query import Comparator, Comparison, Operation, Operator
+from langchain_core.tools import StructuredTool, tool
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
+from utils.locks import index_lock
+from utils.metadata_index import get_metadata_index
+from utils.result_sets import register_result_set, resolve_result_set
+from utils.self_query import CORRECTION_KEY
+from utils.transforms import TransformError, compile_pattern, render_value, validate_template
 
 
-@tool
-def get_filepaths_by_query_with_retriever_tool(query: str) -> list[str]:
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# 최근 검색 결과 (페이지 이동 시 재검색 방지), 태그가 수정되면 무효화
+_recent_results = OrderedDict()
+_recent_lock = threading.Lock()
+_MAX_RECENT_RESULTS = 32
+
+
+def encode_cursor(query: str, offset: int) -> str:
+    payload = json.dumps({"query": query, "offset": offset}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    return payload["query"], int(payload["offset"])
+
+
+def _recent_result(key):
+    with _recent_lock:
+        if key not in _recent_results:
+            return None
+        _recent_results.move_to_end(key)
+        return _recent_results[key]
+
+
+def _remember_result(key, result):
+    with _recent_lock:
+        _recent_results[key] = result
+        while len(_recent_results) > _MAX_RECENT_RESULTS:
+            _recent_results.popitem(last=False)
+    return result
+
+
+def _correction_notes(docs) -> list[str]:
+    return sorted({doc.metadata[CORRECTION_KEY] for doc in docs if doc.metadata.get(CORRECTION_KEY)})
+
+
+def search_result_set(query: str) -> tuple[list[str], str, list[str]]:
     """
-    Returns a list of filepaths of music files that correspond to a given query message.
+    Run the retriever and return the sorted, de-duplicated filepaths together with
+    a result-set handle registered for them and the spelling corrections the
+    retriever applied to the filter (recent results are reused).
+    """
+    key = (query, get_write_generation())
+    cached = _recent_result(key)
+    if cached is not None:
+        return cached
+
+    # The query constructor may call the LLM, so it runs before the index lock is taken;
+    # readers only hold the lock for the index/Chroma lookup
+    structured_query = get_retriever().build_structured_query(query)
+    with index_lock.read():
+        docs = get_retriever().search_structured(query, structured_query)
+    filepaths = sorted({doc.metadata["filepath"] for doc in docs if doc.metadata.get("filepath")})
+
+    return _remember_result(key, (filepaths, register_result_set(filepaths, query), _correction_notes(docs)))
+
+
+async def asearch_result_set(query: str) -> tuple[list[str], str, list[str]]:
+    """Async search_result_set: retrieval awaits the retriever, SQLite I/O runs in a thread."""
+    key = (query, get_write_generation())
+    cached = _recent_result(key)
+    if cached is not None:
+        return cached
+
+    structured_query = await get_retriever().abuild_structured_query(query)
+    async with index_lock.aread():
+        docs = await get_retriever().asearch_structured(query, structured_query)
+    filepaths = sorted({doc.metadata["filepath"] for doc in docs if doc.metadata.get("filepath")})
+
+    handle = await asyncio.to_thread(register_result_set, filepaths, query)
+    return _remember_result(key, (filepaths, handle, _correction_notes(docs)))
+
+
+def search_filepaths(query: str) -> list[str]:
+    return search_result_set(query)[0]
+
+
+def clear_recent_results():
+    with _recent_lock:
+        _recent_results.clear()
+
+
+def update_files(field: str, items) -> dict | str:
+    """
+    Set field on each (filepath, value) in items. Inside a TagWriteBatch the
+    changes are queued; otherwise files are written on a bounded worker pool
+    with a per-file timeout, and per-file failures are reported.
+    """
+    items = list(items)
+    batch = get_active_write_batch()
+    if batch is not None:
+        for filepath, value in items:
+            batch.set(filepath, field, value)
+        return f"{len(items)}개 파일 변경 대기"
+
+    results = save_tags_bulk(get_vector_store(), [(filepath, {field: value}) for filepath, value in items])
+    return summarize_write_results(results)
+
+
+def _page(query: str, filepaths: list[str], handle: str, corrections: list[str], offset: int, page_size: int) -> dict:
+    page = filepaths[offset:offset + page_size]
+    next_offset = offset + len(page)
+    return {
+        "result_set": handle,
+        "corrections": corrections,
+        "total": len(filepaths),
+        "offset": offset,
+        "filepaths": page,
+        "next_cursor": encode_cursor(query, next_offset) if next_offset < len(filepaths) else None,
+    }
+
+
+def _page_args(query: str, cursor: Optional[str], page_size: int) -> tuple[str, int, int]:
+    offset = 0
+    if cursor:
+        query, offset = decode_cursor(cursor)
+    return query, offset, max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def get_filepaths_page(query: str, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Returns one page of filepaths of music files that correspond to a given query message,
+    with the total number of matches, a result_set handle for the full result,
+    the spelling corrections applied to the search (if any)
+    and a cursor for the next page (None on the last page).
     Example: “Music files with the genre Pop”
+    Args:
+        query: Query message
+        cursor: next_cursor from a previous call, to fetch the following page
+        page_size: Number of filepaths per page
+    """
+    query, offset, page_size = _page_args(query, cursor, page_size)
+    filepaths, handle, corrections = search_result_set(query)
+    return _page(query, filepaths, handle, corrections, offset, page_size)
+
+
+async def aget_filepaths_page(query: str, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    query, offset, page_size = _page_args(query, cursor, page_size)
+    filepaths, handle, corrections = await asearch_result_set(query)
+    return _page(query, filepaths, handle, corrections, offset, page_size)
+
+
+# Sync and async implementations behind one tool
+get_filepaths_by_query_with_retriever_tool = StructuredTool.from_function(
+    func=get_filepaths_page,
+    coroutine=aget_filepaths_page,
+    name="get_filepaths_by_query_with_retriever_tool",
+)
+
+
+class MetadataFields(BaseModel):
+    """Metadata field values; omitted fields are left unchanged (or not used for matching)."""
+    title: Optional[str] = None
+    album: Optional[str] = None
+    artist: Optional[str] = None
+    genre: Optional[str] = None
+    year: Optional[str] = None
+    track: Optional[str] = None
+    comment: Optional[str] = None
+    album_artist: Optional[str] = None
+
+
+class FileChange(BaseModel):
+    filepath: str = Field(description="File path")
+    fields: MetadataFields = Field(description="Fields to set on this file")
+
+
+def select_filepaths(match: dict) -> list[str]:
+    """Filepaths whose metadata equals every value in match (through the metadata index)."""
+    metadata_index = get_metadata_index()
+    if metadata_index is None:
+        raise RuntimeError("메타데이터 인덱스가 초기화되지 않았습니다.")
+    comparisons = [Comparison(comparator=Comparator.EQ, attribute=field, value=value) for field, value in match.items()]
+    query_filter = comparisons[0] if len(comparisons) == 1 else Operation(operator=Operator.AND, arguments=comparisons)
+    with index_lock.read():
+        return [record["filepath"] for record in metadata_index.search(query_filter)]
+
+
+def apply_changes(changes: dict[str, dict]) -> dict | str:
+    """Queue {filepath: fields} into the active TagWriteBatch, or commit them as one batch."""
+    batch = get_active_write_batch()
+    if batch is not None:
+        for filepath, fields in changes.items():
+            batch.set_many(filepath, fields)
+        return f"{len(changes)}개 파일 변경 대기"
+
+    batch = TagWriteBatch(get_vector_store())
+    for filepath, fields in changes.items():
+        batch.set_many(filepath, fields)
+    return summarize_write_results(list(batch.commit().values()))
+
+
+def plan_metadata_changes(
+    changes: Optional[List[FileChange]] = None,
+    result_set: Optional[str] = None,
+    filter: Optional[MetadataFields] = None,
+    fields: Optional[MetadataFields] = None,
+) -> dict[str, dict] | str:
+    """
+    Resolve apply_metadata_changes arguments to {filepath: fields} without
+    writing anything, or an error message for invalid arguments.
+    """
+    merged = {}
+    for change in changes or []:
+        values = change.fields.model_dump(exclude_none=True)
+        if values:
+            merged.setdefault(change.filepath, {}).update(values)
+
+    if result_set or filter is not None or fields is not None:
+        match = filter.model_dump(exclude_none=True) if filter is not None else {}
+        values = fields.model_dump(exclude_none=True) if fields is not None else {}
+        if not (result_set or match) or not values:
+            return "result_set 또는 filter와 fields를 함께 지정해야 합니다."
+        try:
+            selected = resolve_result_set(result_set) if result_set else None
+        except KeyError as e:
+            return e.args[0]
+        if match:
+            matched = select_filepaths(match)
+            if selected is not None:
+                matched_set = set(matched)
+                matched = [fp for fp in selected if fp in matched_set]
+            selected = matched
+        for filepath in selected:
+            merged.setdefault(filepath, {}).update(values)
+
+    return merged
+
+
+@tool
+def apply_metadata_changes(
+    changes: Optional[List[FileChange]] = None,
+    result_set: Optional[str] = None,
+    filter: Optional[MetadataFields] = None,
+    fields: Optional[MetadataFields] = None,
+) -> dict | str:
+    """
+    Apply metadata changes to audio files in one batch; each file is written once.
+    Either pass changes (a list of filepath + fields to set on that file),
+    or select files with result_set (a handle from the retriever, e.g. "rs-1a2b3c4d5e") and/or
+    filter (exact field values), together with fields (values to set on every selected file).
+    Prefer result_set over listing filepaths. Both forms can be combined in one call.
+    Args:
+        changes: List of {filepath, fields}
+        result_set: Result set handle returned by the retriever
+        filter: Field values that selected files must match
+        fields: Field values to set on every selected file
+    """
+    merged = plan_metadata_changes(changes, result_set, filter, fields)
+    if isinstance(merged, str):
+        return merged
+    if not merged:
+        return "변경할 파일이 없습니다."
+    return apply_changes(merged)
+
+
+TRANSFORM_PREVIEW_SIZE = 20
+# Seconds one transform call may spend computing values (it runs outside the per-file write timeout)
+TRANSFORM_TIME_BUDGET = 10.0
+
+
+def current_record(filepath: str) -> dict:
+    """Current metadata of filepath from the metadata index, falling back to the file itself."""
+    metadata_index = get_metadata_index()
+    with index_lock.read():
+        record = metadata_index.get(filepath) if metadata_index is not None else None
+    return record if record is not None else read_metadata(filepath)
+
+
+@tool
+def transform_metadata(
+    field: str,
+    template: Optional[str] = None,
+    pattern: Optional[str] = None,
+    replacement: str = "",
+    result_set: Optional[str] = None,
+    filepaths: Optional[List[str]] = None,
+    preview: bool = True,
+) -> dict | str:
     """
-    retriever = get_retriever()
-    docs = retriever.invoke(query)
-    filepaths = [doc.metadata.get("filepath", "") for doc in docs if "filepath" in doc.metadata]
-    return filepaths
+    Compute a new value of one field for every selected file on the server, instead of listing values per file.
+    The value is template (if given) rendered with placeholders, then the regex substitution pattern -> replacement
+    (Python re syntax, applied to the template result or to the current value).
+    Placeholders: {title} {album} {artist} {genre} {year} {track} {comment} {album_artist} {filename}
+    {filename_stem} {extension} {folder} {track_number} {track_total} {year4}; the only format spec is zero padding
+    of {track_number} / {track_total}, e.g. {track_number:02d}. Patterns may use at most 3 quantifiers and no nested
+    quantifiers, alternation inside a quantifier or backreferences. Files whose value would be empty are skipped.
+    Examples: title from file name -> template="{filename_stem}";
+    strip "feat." from artists -> pattern="\\s*\\(?feat\\..*$", replacement="";
+    zero-pad track numbers -> template="{track_number:02d}".
+    With preview=True (default) nothing is written and sample before/after values are returned;
+    call again with preview=False to commit the changes as one batch.
+    Args:
+        field: Field to set (title, album, artist, genre, year, track, comment, album_artist)
+        template: Template for the new value
+        pattern: Regular expression to substitute
+        replacement: Replacement for pattern
+        result_set: Result set handle returned by the retriever
+        filepaths: Explicit list of file paths (when no result_set)
+        preview: Only preview the changes without writing
+    """
+    if field not in MetadataFields.model_fields:
+        return f"지원하지 않는 필드입니다: {field}"
+    if template is None and pattern is None:
+        return "template 또는 pattern을 지정해야 합니다."
+
+    try:
+        selected = resolve_result_set(result_set) if result_set else list(filepaths or [])
+        if template is not None:
+            validate_template(template)
+        compiled = compile_pattern(pattern) if pattern is not None else None
+    except (KeyError, TransformError) as e:
+        return e.args[0]
+    if not selected:
+        return "변경할 파일이 없습니다."
+
+    changes, samples, errors = {}, [], []
+    deadline = time.monotonic() + TRANSFORM_TIME_BUDGET
+    for filepath in selected:
+        if time.monotonic() > deadline:
+            return f"변환 시간이 초과되었습니다 ({TRANSFORM_TIME_BUDGET}초). 파일 수를 줄이거나 더 단순한 정규식을 사용하세요."
+        record = current_record(filepath)
+        try:
+            new_value = render_value(record, field, template, compiled, replacement)
+        except TransformError as e:
+            errors.append({"filepath": filepath, "error": str(e)})
+            continue
+        if new_value is None or new_value == record.get(field):
+            continue
+        changes[filepath] = {field: new_value}
+        if len(samples) < TRANSFORM_PREVIEW_SIZE:
+            samples.append({"filepath": filepath, "before": record.get(field), "after": new_value})
+
+    if preview:
+        return {
+            "preview": True,
+            "selected": len(selected),
+            "changed": len(changes),
+            "unchanged": len(selected) - len(changes) - len(errors),
+            "samples": samples,
+            "errors": errors[:TRANSFORM_PREVIEW_SIZE],
+        }
+    if not changes:
+        return "변경될 값이 없습니다."
+    return apply_changes(changes)
+
 
 @tool
-def batch_update_artist_tool(filepaths: List[str], artists: List[str]):
+def batch_update_artist_tool(filepaths: List[str], artists: List[str]) -> dict | str:
     """
     Update the artists of the given audio files.
     filepaths and artists should be of the same length, and each file will be updated with the corresponding artist.
@@ -30,39 +382,27 @@ def batch_update_artist_tool(filepaths: List[str], artists: List[str]):
     if len(filepaths) != len(artists):
         return "filepaths와 artists의 길이가 같아야 합니다."
 
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, artist in zip(filepaths, artists):
-        vector_store = update_artist(vector_store, path, artist)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("artist", zip(filepaths, artists))
 
 @tool
-def batch_update_to_same_artist_tool(filepaths: List[str], artist: str):
+def batch_update_to_same_artist_tool(filepaths: List[str], artist: str) -> dict | str:
     """
     Update to same artist of the given audio files.
     Args:
         filepaths: List of file paths
         artist: artist
     """
-    success_count = 0
-    vector_store = get_vector_store()
-    for path in filepaths:
-        vector_store = update_artist(vector_store, path, artist)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("artist", [(path, artist) for path in filepaths])
 
 @tool
 def update_title_tool(filepath: str, title: str) -> str:
     """Update the title of the given audio file.
     Args: filepath:filepath, title:title
     """
-    vector_store = get_vector_store()
-    vector_store = update_title(vector_store, filepath, title)
-    return 'title updated successfully'
+    return update_title(get_vector_store(), filepath, title)
 
 @tool
-def batch_update_album_tool(filepaths: List[str], albums: List[str]) -> str:
+def batch_update_album_tool(filepaths: List[str], albums: List[str]) -> dict | str:
     """
     Update the different albums of the given audio files.
     filepaths and albums should be of the same length, and each file will be updated with the corresponding album.
@@ -73,64 +413,42 @@ def batch_update_album_tool(filepaths: List[str], albums: List[str]) -> str:
     if len(filepaths) != len(albums):
         return "filepaths와 albums의 길이가 같아야 합니다."
 
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, album in zip(filepaths, albums):
-        vector_store = update_album(vector_store, path, album)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("album", zip(filepaths, albums))
 
 @tool
-def batch_update_to_same_album_tool(filepaths: List[str], album: str) -> str:
+def batch_update_to_same_album_tool(filepaths: List[str], album: str) -> dict | str:
     """
     Update to same album of the given audio files.
     Args:
         filepaths: List of file paths
         album: album
     """
-    success_count = 0
-    vector_store = get_vector_store()
-    for path in filepaths:
-        vector_store = update_album(vector_store, path, album)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("album", [(path, album) for path in filepaths])
 
 
 @tool
-def batch_update_genre_tool(filepaths: List[str], genres: List[str]) -> str:
+def batch_update_genre_tool(filepaths: List[str], genres: List[str]) -> dict | str:
     """
     Update the different genres of the given audio files.
     filepaths and genres should be of the same length, and each file will be updated with the corresponding genre.
     Args: filepaths: List of file paths, genres: List of genres
     """
     if len(filepaths) != len(genres):
-        return ["filepaths와 genres의 길이가 같아야 합니다."]
+        return "filepaths와 genres의 길이가 같아야 합니다."
     
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, genre in zip(filepaths, genres):
-        vector_store = update_genre(vector_store, path, genre)
-        success_count += 1
-        
-    return f"{success_count}개 성공"
+    return update_files("genre", zip(filepaths, genres))
 
 @tool
-def batch_update_to_same_genre_tool(filepaths: List[str], genre: str) -> str:
+def batch_update_to_same_genre_tool(filepaths: List[str], genre: str) -> dict | str:
     """
     Update to same genres of the given audio files.
     filepaths and genres should be of the same length, and each file will be updated with the corresponding genre.
     Args: filepaths: List of file paths, genres: genre
     """
-    success_count = 0
-    vector_store = get_vector_store()
-    for path in filepaths:
-        vector_store = update_genre(vector_store, path, genre)
-        success_count += 1
-        
-    return f"{success_count}개 성공"
+    return update_files("genre", [(path, genre) for path in filepaths])
 
 @tool
-def batch_update_year_tool(filepaths: List[str], years: List[str]) -> str:
+def batch_update_year_tool(filepaths: List[str], years: List[str]) -> dict | str:
     """
     Update the different years of the given audio files.
     filepaths and years should be of the same length, and each file will be updated with the corresponding year.
@@ -141,50 +459,34 @@ def batch_update_year_tool(filepaths: List[str], years: List[str]) -> str:
     if len(filepaths) != len(years):
         return "filepaths와 years의 길이가 같아야 합니다."
 
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, year in zip(filepaths, years):
-        vector_store = update_year(vector_store, path, year)
-        success_count += 1
-
-    return f"{success_count}개 성공"
+    return update_files("year", zip(filepaths, years))
 
 @tool
-def batch_update_to_same_year_tool(filepaths: List[str], year: str) -> str:
+def batch_update_to_same_year_tool(filepaths: List[str], year: str) -> dict | str:
     """
     Update to same year of the given audio files.
     Args:
         filepaths: List of file paths
         year: year
     """
-    success_count = 0
-    vector_store = get_vector_store()
-    for path in filepaths:
-        vector_store = update_year(vector_store, path, year)
-        success_count += 1
-
-    return f"{success_count}개 성공"
+    return update_files("year", [(path, year) for path in filepaths])
 
 @tool
 def update_track_tool(filepath: str, track: str) -> str:
     """Update the track number of the given audio file.
     Args: filepath:filepath, track:track
     """
-    vector_store = get_vector_store()
-    vector_store = update_track(vector_store, filepath, track)
-    return "track updated successfully"
+    return update_track(get_vector_store(), filepath, track)
 
 @tool
 def update_comment_tool(filepath: str, comment: str) -> str:
     """Update the comment of the given audio file.
     Args: filepath:filepath, comment:comment
     """
-    vector_store = get_vector_store()
-    vector_store = update_comment(vector_store, filepath, comment)
-    return "comment updated successfully"
+    return update_comment(get_vector_store(), filepath, comment)
 
 @tool
-def batch_update_comment_tool(filepaths: List[str], comments: List[str]) -> str:
+def batch_update_comment_tool(filepaths: List[str], comments: List[str]) -> dict | str:
     """
     Update the different comments of the given audio files.
     filepaths and comments should be of the same length, and each file will be updated with the corresponding comment.
@@ -195,16 +497,10 @@ def batch_update_comment_tool(filepaths: List[str], comments: List[str]) -> str:
     if len(filepaths) != len(comments):
         return "filepaths와 comments의 길이가 같아야 합니다."
 
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, comment in zip(filepaths, comments):
-        vector_store = update_comment(vector_store, path, comment)
-        success_count += 1
-
-    return f"{success_count}개 성공"
+    return update_files("comment", zip(filepaths, comments))
 
 @tool
-def batch_update_album_artist_tool(filepaths: List[str], album_artists: List[str]) -> str:
+def batch_update_album_artist_tool(filepaths: List[str], album_artists: List[str]) -> dict | str:
     """
     Update the different album artists of the given audio files.
     filepaths and album_artists should be of the same length, and each file will be updated with the corresponding album artist.
@@ -215,27 +511,17 @@ def batch_update_album_artist_tool(filepaths: List[str], album_artists: List[str
     if len(filepaths) != len(album_artists):
         return "filepaths와 album_artists의 길이가 같아야 합니다."
 
-    success_count = 0
-    vector_store = get_vector_store()
-    for path, album_artist in zip(filepaths, album_artists):
-        vector_store = update_album_artist(vector_store, path, album_artist)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("album_artist", zip(filepaths, album_artists))
 
 @tool
-def batch_update_to_same_album_artist_tool(filepaths: List[str], album_artist: str) -> str:
+def batch_update_to_same_album_artist_tool(filepaths: List[str], album_artist: str) -> dict | str:
     """
     Update to same album artist of the given audio files.
     Args:
         filepaths: List of file paths
         album_artist: album artist
     """
-    success_count = 0
-    vector_store = get_vector_store()
-    for path in filepaths:
-        vector_store = update_album_artist(vector_store, path, album_artist)
-        success_count += 1
-    return f"{success_count}개 성공"
+    return update_files("album_artist", [(path, album_artist) for path in filepaths])
 
 # @tool
 # def batch_update_composer_tool(filepaths: List[str], composers: List[str]) -> str:
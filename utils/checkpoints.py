@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+CHECKPOINT_PATH = ".cache/checkpoints.db"
+
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "10"))
+CHECKPOINT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", str(7 * 86400)))
+
+
+class DurableCheckpointer(SqliteSaver):
+    """
+    File-backed LangGraph checkpointer. Only the latest keep_per_thread
+    checkpoints of each thread are kept, threads idle for longer than max_age
+    are dropped, and compaction runs every compact_every writes so the file
+    (and a long-running server) stays flat. A thread stopped at the approval
+    interrupt can be resumed after a restart. The async methods run the
+    SQLite calls in worker threads, so the same saver serves invoke and ainvoke.
+    """
+
+    def __init__(self, db_path: str = CHECKPOINT_PATH, keep_per_thread: int = CHECKPOINT_KEEP_PER_THREAD,
+                 max_age: float = CHECKPOINT_MAX_AGE, compact_every: int = 200):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Must be set before the tables exist for incremental_vacuum to reclaim pages
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated REAL NOT NULL)")
+        conn.commit()
+        super().__init__(conn)
+        self.setup()
+        self.keep_per_thread = keep_per_thread
+        self.max_age = max_age
+        self.compact_every = compact_every
+        self._puts = 0
+
+    def put(self, config, *args, **kwargs):
+        next_config = super().put(config, *args, **kwargs)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, updated) VALUES (?, ?)",
+                (str(config["configurable"]["thread_id"]), time.time()),
+            )
+            self.conn.commit()
+            self._puts += 1
+            due = self._puts % self.compact_every == 0
+        if due:
+            self.compact()
+        return next_config
+
+    def delete_thread(self, thread_id: str):
+        with self.lock:
+            self._delete_threads([str(thread_id)])
+            self.conn.commit()
+
+    def _delete_threads(self, thread_ids: list[str]):
+        for table in ("writes", "checkpoints", "thread_activity"):
+            self.conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def compact(self) -> dict:
+        """Apply the retention limits and give freed pages back to the file system."""
+        with self.lock:
+            cutoff = time.time() - self.max_age
+            expired = [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated < ?", (cutoff,)
+            )]
+            self._delete_threads(expired)
+
+            # checkpoint ids are time-ordered, so the newest ones sort last
+            pruned = self.conn.execute(
+                "DELETE FROM checkpoints WHERE rowid IN ("
+                " SELECT rowid FROM ("
+                "  SELECT rowid, ROW_NUMBER() OVER ("
+                "   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rank"
+                "  FROM checkpoints)"
+                " WHERE rank > ?)",
+                (self.keep_per_thread,),
+            ).rowcount
+            self.conn.execute(
+                "DELETE FROM writes WHERE NOT EXISTS ("
+                " SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+                " AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)"
+            )
+            self.conn.commit()
+            self.conn.execute("PRAGMA incremental_vacuum")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"expired_threads": len(expired), "pruned_checkpoints": pruned}
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for item in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config, *args, **kwargs):
+        return await asyncio.to_thread(self.put, config, *args, **kwargs)
+
+    async def aput_writes(self, config, *args, **kwargs):
+        return await asyncio.to_thread(self.put_writes, config, *args, **kwargs)
+
+    async def adelete_thread(self, thread_id: str):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+checkpointer = None
+
+
+def get_checkpointer() -> DurableCheckpointer:
+    global checkpointer
+    if checkpointer is None:
+        checkpointer = DurableCheckpointer()
+        checkpointer.compact()
+    return checkpointer
+
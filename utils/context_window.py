@@ -0,0 +1,134 @@
+import json
+from functools import lru_cache
+
+import tiktoken
+from langchain_core.messages import RemoveMessage
+
+
+SUMMARY_TEXT_LIMIT = 160
+# Share of the budget left after the latest turn that is held back for summaries of older turns
+SUMMARY_BUDGET_SHARE = 0.25
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # tiktoken downloads the BPE file on first use; without network (or cache) estimate instead
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly 3-4 Latin characters per token, about one token per Hangul syllable; errs on the high side
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return -(-ascii_chars // 3) + (len(text) - ascii_chars)
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return _estimate_tokens(text or "")
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def _content(message) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+
+def message_tokens(message) -> int:
+    """Approximate prompt cost of one message: content, tool call arguments and a small per-message overhead."""
+    tokens = 4 + count_tokens(_content(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(tool_call["name"]) + count_tokens(json.dumps(tool_call["args"], ensure_ascii=False))
+    return tokens
+
+
+def split_turns(messages: list) -> list[list]:
+    """Group messages into turns, each starting at a human message."""
+    turns = []
+    for message in messages:
+        if message.type == "human" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def expired_turn_messages(messages: list, keep_turns: int) -> list[RemoveMessage]:
+    """
+    RemoveMessage updates for every turn but the latest keep_turns, so the
+    thread state (and its checkpoints) stops growing with the conversation.
+    Whole turns are removed, never a tool call without its answer.
+    """
+    turns = split_turns(messages)
+    return [RemoveMessage(id=m.id) for turn in turns[:max(len(turns) - keep_turns, 0)] for m in turn if m.id]
+
+
+def _shorten(text: str, limit: int = SUMMARY_TEXT_LIMIT) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summarize_turn(turn: list) -> str:
+    """
+    One line per turn: the request, the retrieval headline (count and
+    result_set handle, not the paths), the tools called and their outcome.
+    """
+    parts = []
+    for message in turn:
+        content = _content(message)
+        if message.type == "human":
+            parts.append(f"user: {_shorten(content)}")
+        elif message.type == "tool":
+            parts.append(f"{message.name or 'tool'} -> {_shorten(content)}")
+        elif getattr(message, "tool_calls", None):
+            parts.append("called " + ", ".join(tool_call["name"] for tool_call in message.tool_calls))
+        elif content:
+            parts.append(f"agent: {_shorten(content.splitlines()[0])}")
+    return " | ".join(parts)
+
+
+def fit_messages(messages: list, budget: int) -> tuple[str | None, list]:
+    """
+    Keep the conversation under budget tokens. The latest turn (its retrieval
+    result and any pending tool calls) is always kept verbatim. When the older
+    turns do not all fit, SUMMARY_BUDGET_SHARE of the remaining budget is
+    reserved for one-line summaries; older turns are kept verbatim
+    newest-first within the rest, and the ones left over are summarized
+    (oldest dropped first if even the summaries do not fit).
+    Returns (summary of older turns or None, messages to send).
+    """
+    turns = split_turns(messages)
+    if not turns:
+        return None, []
+
+    kept = list(turns[-1])
+    used = sum(message_tokens(m) for m in kept)
+
+    older = turns[:-1]
+    costs = [sum(message_tokens(m) for m in turn) for turn in older]
+    verbatim_budget = budget
+    if used + sum(costs) > budget:
+        verbatim_budget = budget - int(max(budget - used, 0) * SUMMARY_BUDGET_SHARE)
+
+    verbatim_from = len(older)
+    for i in range(len(older) - 1, -1, -1):
+        if used + costs[i] > verbatim_budget:
+            break
+        used += costs[i]
+        verbatim_from = i
+    kept = [m for turn in older[verbatim_from:] for m in turn] + kept
+
+    lines = []
+    for turn in reversed(older[:verbatim_from]):
+        line = f"- {summarize_turn(turn)}"
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        used += cost
+        lines.append(line)
+
+    if not lines:
+        return None, kept
+    return "Earlier turns (summarized):\n" + "\n".join(reversed(lines)), kept
@@ -0,0 +1,156 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+
+FUZZY_FIELDS = ["artist", "album_artist", "album", "title"]
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+# 호환용 자모 (초성/중성/종성)
+_INITIALS = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_MEDIALS = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_FINALS = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+           "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+# 국어의 로마자 표기법 (단순화)
+_ROMAN_INITIALS = ["g", "kk", "n", "d", "tt", "r", "m", "b", "pp", "s", "ss", "", "j", "jj", "ch", "k", "t", "p", "h"]
+_ROMAN_MEDIALS = ["a", "ae", "ya", "yae", "eo", "e", "yeo", "ye", "o", "wa", "wae", "oe", "yo", "u", "wo", "we", "wi",
+                  "yu", "eu", "ui", "i"]
+_ROMAN_FINALS = ["", "k", "k", "k", "n", "n", "n", "t", "l", "k", "m", "l", "l", "l", "p", "l", "m", "p", "p", "t", "t",
+                 "ng", "t", "t", "k", "t", "p", "t"]
+
+
+def _syllables(text: str):
+    for char in text:
+        code = ord(char)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            offset = code - _HANGUL_BASE
+            yield char, (offset // 588, (offset % 588) // 28, offset % 28)
+        else:
+            yield char, None
+
+
+def normalize_text(text: str) -> str:
+    """NFKC + casefold, keeping only letters and digits."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"[\W_]+", "", text)
+
+
+def to_jamo(text: str) -> str:
+    """Decompose Hangul syllables into compatibility jamo ("아이유" -> "ㅇㅏㅇㅣㅇㅠ")."""
+    result = []
+    for char, parts in _syllables(normalize_text(text)):
+        if parts is None:
+            result.append(char)
+        else:
+            initial, medial, final = parts
+            result.append(_INITIALS[initial] + _MEDIALS[medial] + _FINALS[final])
+    return "".join(result)
+
+
+def romanize(text: str) -> str:
+    """Simplified Revised Romanization, so Latin spellings can match Hangul values."""
+    result = []
+    for char, parts in _syllables(normalize_text(text)):
+        if parts is None:
+            result.append(char)
+        else:
+            initial, medial, final = parts
+            result.append(_ROMAN_INITIALS[initial] + _ROMAN_MEDIALS[medial] + _ROMAN_FINALS[final])
+    return "".join(result)
+
+
+def _grams(text: str, n: int = 2) -> set[str]:
+    if not text:
+        return set()
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _keys(value: str) -> list[str]:
+    keys = [to_jamo(value)]
+    roman = romanize(value)
+    if roman != normalize_text(value):
+        keys.append(roman)
+    return keys
+
+
+class FuzzyIndex:
+    """
+    n-gram index over the distinct artist/album_artist/album/title values.
+    Values are NFKC-normalized, Hangul is decomposed into jamo (and also
+    romanized), and candidates are ranked by Dice similarity of their bigrams.
+    """
+
+    def __init__(self, records=(), fields: list[str] = FUZZY_FIELDS):
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._entries = []  # entry id -> (field, value, gram count)
+        self._indexed = set()  # (field, value)
+        self._postings = {}  # gram -> set of entry ids
+        for record in records:
+            self._add_record(record)
+
+    def add(self, field: str, value):
+        with self._lock:
+            self._add(field, value)
+
+    def add_record(self, record: dict):
+        with self._lock:
+            self._add_record(record)
+
+    def _add_record(self, record: dict):
+        for field in self.fields:
+            self._add(field, record.get(field))
+
+    def _add(self, field: str, value):
+        if field not in self.fields or not value or (field, value) in self._indexed:
+            return
+        for key in _keys(str(value)):
+            grams = _grams(key)
+            if not grams:
+                continue
+            entry_id = len(self._entries)
+            self._entries.append((field, value, len(grams)))
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(entry_id)
+        self._indexed.add((field, value))
+
+    def search(self, text: str, fields: list[str] | None = None, limit: int = 5, min_score: float = 0.5) -> list[tuple[str, str, float]]:
+        """Return up to limit (field, value, score) candidates, best first."""
+        best = {}
+        with self._lock:
+            for key in _keys(text):
+                grams = _grams(key)
+                if not grams:
+                    continue
+                shared = Counter()
+                for gram in grams:
+                    shared.update(self._postings.get(gram, ()))
+                for entry_id, count in shared.items():
+                    field, value, gram_count = self._entries[entry_id]
+                    if fields is not None and field not in fields:
+                        continue
+                    score = 2 * count / (len(grams) + gram_count)
+                    if score >= min_score and score > best.get((field, value), 0.0):
+                        best[(field, value)] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(field, value, score) for (field, value), score in ranked]
+
+
+fuzzy_index = None
+
+
+def init_fuzzy_index(records) -> FuzzyIndex:
+    global fuzzy_index
+    fuzzy_index = FuzzyIndex(records)
+    return fuzzy_index
+
+
+def get_fuzzy_index() -> FuzzyIndex | None:
+    return fuzzy_index
@@ -0,0 +1,54 @@
+import threading
+from itertools import cycle
+
+import httpx
+
+
+class LLMPool:
+    """
+    Process-wide pool of chat model clients that share keep-alive HTTP
+    connection pools. Tool bindings are cached per client, so a turn only has
+    to pick the next client instead of constructing and binding a new one.
+    """
+
+    def __init__(self, factory, size: int = 4, timeout: float = 60.0):
+        self.size = size
+        limits = httpx.Limits(max_connections=size * 2, max_keepalive_connections=size)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self.clients = [factory(self.http_client, self.http_async_client) for _ in range(size)]
+        self._next = cycle(range(size))
+        self._bound = {}  # (client index, tool names) -> bound runnable
+        self._lock = threading.Lock()
+
+    def _next_index(self) -> int:
+        with self._lock:
+            return next(self._next)
+
+    def get(self):
+        return self.clients[self._next_index()]
+
+    def get_bound(self, tools):
+        index = self._next_index()
+        key = (index, tuple(t.name for t in tools))
+        with self._lock:
+            bound = self._bound.get(key)
+        if bound is None:
+            bound = self.clients[index].bind_tools(tools)
+            with self._lock:
+                self._bound.setdefault(key, bound)
+        return bound
+
+    def warm_up(self, tools=(), url: str | None = None):
+        """Pre-bind tools on every client and open a keep-alive connection to url."""
+        for _ in range(self.size):
+            if tools:
+                self.get_bound(tools)
+        if url:
+            try:
+                self.http_client.get(url, timeout=5.0)
+            except httpx.HTTPError as e:
+                print(f"[경고] LLM 연결 예열 실패: {e}")
+
+    def close(self):
+        self.http_client.close()
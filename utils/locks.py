@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer. Waiting writers block new readers,
+    so a steady stream of searches cannot starve tag writes. The writing
+    thread may re-enter (read or write); readers must not nest.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None  # owning thread id
+        self._depth = 0
+        self._writers_waiting = 0
+
+    def _owned(self) -> bool:
+        return self._writer == threading.get_ident()
+
+    def acquire_read(self):
+        with self._cond:
+            if self._owned():
+                self._depth += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            if self._owned():
+                self._depth -= 1
+                return
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            if self._owned():
+                self._depth += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = threading.get_ident()
+            self._depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    @asynccontextmanager
+    async def aread(self):
+        """read() for coroutines: waits in a worker thread instead of blocking the event loop."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire_read))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The worker thread still takes the read lock; give it back once it has
+            acquiring.add_done_callback(lambda f: None if f.cancelled() or f.exception() else self.release_read())
+            raise
+        try:
+            yield
+        finally:
+            self.release_read()
+
+
+class KeyedLocks:
+    """One lock per key (e.g. per filepath), created on demand and dropped when unused."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}  # key -> [lock, users]
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+# Guards the shared catalog/metadata index/vector store: searches read, tag writes and rebuilds write
+index_lock = ReadWriteLock()
+
+# Serializes read-modify-save of the same audio file across sessions
+file_locks = KeyedLocks()
@@ -0,0 +1,224 @@
+import re
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+from langchain_core.structured_query import Comparator, Comparison, Operation, Operator
+
+from utils.tag_catalog import METADATA_FIELDS
+
+
+INDEX_FIELDS = ["filepath"] + METADATA_FIELDS
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _key(value) -> str | None:
+    # 동등 비교는 대소문자/전각 차이를 무시
+    return None if value is None else unicodedata.normalize("NFKC", str(value)).casefold()
+
+
+def parse_year(value) -> int | None:
+    match = re.match(r"\s*(\d{4})", str(value)) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+class MetadataIndex:
+    """
+    In-process columnar index over the catalog fields. Each row is a file; each
+    field has a column of (interned) values plus a value -> row-set map, and
+    years are kept in a sorted column for range queries. Structured query
+    filters are answered with set operations, without touching Chroma.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self._filepaths = []
+        self._rows = {}
+        self._free_rows = []
+        self._columns = {field: [] for field in INDEX_FIELDS}
+        self._postings = {field: {} for field in INDEX_FIELDS}
+        self._years = []  # sorted (year, row)
+        self._years_dirty = False
+        for record in records:
+            self._add(record)
+
+    # ---- write path ----
+
+    def add(self, record: dict):
+        with self._lock:
+            self._remove(record["filepath"])
+            self._add(record)
+
+    def update(self, filepath: str, fields: dict):
+        with self._lock:
+            row = self._rows.get(filepath)
+            if row is None:
+                return
+            record = self._record(row)
+            record.update({field: value for field, value in fields.items() if field in METADATA_FIELDS})
+            self._remove(filepath)
+            self._add(record)
+
+    def remove(self, filepath: str):
+        with self._lock:
+            self._remove(filepath)
+
+    def _add(self, record: dict):
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._filepaths)
+            self._filepaths.append(None)
+            for column in self._columns.values():
+                column.append(None)
+
+        filepath = _intern(record["filepath"])
+        self._filepaths[row] = filepath
+        self._rows[filepath] = row
+        for field in INDEX_FIELDS:
+            value = _intern(record.get(field))
+            self._columns[field][row] = value
+            self._postings[field].setdefault(_key(value), set()).add(row)
+        self._years_dirty = True
+
+    def _remove(self, filepath: str):
+        row = self._rows.pop(filepath, None)
+        if row is None:
+            return
+        for field in INDEX_FIELDS:
+            key = _key(self._columns[field][row])
+            rows = self._postings[field].get(key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self._postings[field][key]
+            self._columns[field][row] = None
+        self._filepaths[row] = None
+        self._free_rows.append(row)
+        self._years_dirty = True
+
+    # ---- read path ----
+
+    def _record(self, row: int) -> dict:
+        return {field: self._columns[field][row] for field in INDEX_FIELDS}
+
+    def _all_rows(self) -> set[int]:
+        return set(self._rows.values())
+
+    def _sorted_years(self):
+        if self._years_dirty:
+            years = []
+            for row, value in enumerate(self._columns["year"]):
+                if self._filepaths[row] is not None:
+                    year = parse_year(value)
+                    if year is not None:
+                        years.append((year, row))
+            years.sort()
+            self._years = years
+            self._years_dirty = False
+        return self._years
+
+    def eq(self, field: str, value) -> set[int]:
+        return set(self._postings[field].get(_key(value), ()))
+
+    def prefix(self, field: str, prefix: str) -> set[int]:
+        prefix = _key(prefix)
+        rows = set()
+        for key, key_rows in self._postings[field].items():
+            if key is not None and key.startswith(prefix):
+                rows |= key_rows
+        return rows
+
+    def contains(self, field: str, text: str) -> set[int]:
+        text = _key(text)
+        rows = set()
+        for key, key_rows in self._postings[field].items():
+            if key is not None and text in key:
+                rows |= key_rows
+        return rows
+
+    def year_range(self, low: int | None = None, high: int | None = None) -> set[int]:
+        years = self._sorted_years()
+        start = 0 if low is None else bisect_left(years, (low, -1))
+        end = len(years) if high is None else bisect_right(years, (high, sys.maxsize))
+        return {row for _, row in years[start:end]}
+
+    def _compare(self, comparison: Comparison) -> set[int]:
+        field, value, comparator = comparison.attribute, comparison.value, comparison.comparator
+        if field not in self._postings:
+            raise ValueError(f"Unknown field: {field}")
+
+        if comparator == Comparator.EQ:
+            if field == "year" and re.fullmatch(r"\d{4}", str(value).strip()):
+                # "2005"는 "2005-01-01" 같은 날짜 값도 포함
+                return self.year_range(int(value), int(value))
+            return self.eq(field, value)
+        if comparator == Comparator.NE:
+            return self._all_rows() - self.eq(field, value)
+        if comparator == Comparator.IN:
+            return set().union(*(self.eq(field, item) for item in value))
+        if comparator == Comparator.NIN:
+            return self._all_rows() - set().union(*(self.eq(field, item) for item in value))
+        if comparator in (Comparator.CONTAIN, Comparator.LIKE):
+            return self.contains(field, value)
+
+        if field == "year" and parse_year(value) is not None:
+            year = parse_year(value)
+            if comparator == Comparator.GT:
+                return self.year_range(low=year + 1)
+            if comparator == Comparator.GTE:
+                return self.year_range(low=year)
+            if comparator == Comparator.LT:
+                return self.year_range(high=year - 1)
+            if comparator == Comparator.LTE:
+                return self.year_range(high=year)
+
+        raise ValueError(f"Unsupported comparator for {field}: {comparator}")
+
+    def _evaluate(self, node) -> set[int]:
+        if isinstance(node, Comparison):
+            return self._compare(node)
+        if isinstance(node, Operation):
+            results = [self._evaluate(argument) for argument in node.arguments]
+            if node.operator == Operator.AND:
+                results.sort(key=len)
+                return set.intersection(*results) if results else set()
+            if node.operator == Operator.OR:
+                return set().union(*results)
+            if node.operator == Operator.NOT:
+                return self._all_rows() - set().union(*results)
+        raise ValueError(f"Unsupported filter: {node}")
+
+    def search(self, query_filter=None, limit: int | None = None) -> list[dict]:
+        """Return the records matching a structured query filter (all records when None)."""
+        with self._lock:
+            rows = self._all_rows() if query_filter is None else self._evaluate(query_filter)
+            rows = sorted(rows, key=lambda row: self._filepaths[row])
+            if limit is not None:
+                rows = rows[:limit]
+            return [self._record(row) for row in rows]
+
+    def get(self, filepath: str) -> dict | None:
+        with self._lock:
+            row = self._rows.get(filepath)
+            return None if row is None else self._record(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+metadata_index = None
+
+
+def init_metadata_index(records) -> MetadataIndex:
+    global metadata_index
+    metadata_index = MetadataIndex(records)
+    return metadata_index
+
+
+def get_metadata_index() -> MetadataIndex | None:
+    return metadata_index
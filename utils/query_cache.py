@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.structured_query import Comparator, Comparison, Operation, Operator, StructuredQuery
+
+
+QUERY_CACHE_PATH = ".cache/structured_queries.json"
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text so trivially rephrased lookups share a cache entry."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"[\"'“”‘’`.,!?]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def structured_query_to_dict(structured_query: StructuredQuery) -> dict:
+    return {
+        "query": structured_query.query,
+        "filter": _filter_to_dict(structured_query.filter),
+        "limit": structured_query.limit,
+    }
+
+
+def structured_query_from_dict(data: dict) -> StructuredQuery:
+    return StructuredQuery(query=data["query"], filter=_filter_from_dict(data["filter"]), limit=data["limit"])
+
+
+def _filter_to_dict(node):
+    if node is None:
+        return None
+    if isinstance(node, Comparison):
+        return {
+            "comparator": node.comparator.value,
+            "attribute": node.attribute,
+            "value": node.value,
+        }
+    return {
+        "operator": node.operator.value,
+        "arguments": [_filter_to_dict(argument) for argument in node.arguments],
+    }
+
+
+def _filter_from_dict(data):
+    if data is None:
+        return None
+    if "comparator" in data:
+        return Comparison(comparator=Comparator(data["comparator"]), attribute=data["attribute"], value=data["value"])
+    return Operation(operator=Operator(data["operator"]), arguments=[_filter_from_dict(argument) for argument in data["arguments"]])
+
+
+class StructuredQueryCache:
+    """
+    Bounded LRU cache of normalized query text -> StructuredQuery with a TTL.
+    When path is given, entries are persisted as JSON and reloaded on start.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 24 * 3600, path: str | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, structured query dict)
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, query: str) -> StructuredQuery | None:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return structured_query_from_dict(entry[1])
+
+    def put(self, query: str, structured_query: StructuredQuery):
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, structured_query_to_dict(structured_query))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, data in entries:
+            if expires_at >= now:
+                self._entries[key] = (expires_at, data)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([[key, expires_at, data] for key, (expires_at, data) in self._entries.items()], f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,270 @@
+import re
+from datetime import date
+
+from langchain_core.structured_query import Comparator, Comparison, Operation, Operator, StructuredQuery
+
+
+# 필드별 별칭 (영어/한국어)
+FIELD_ALIASES = {
+    "album_artist": ["album artist", "album_artist", "albumartist", "앨범 아티스트", "앨범아티스트"],
+    "filepath": ["filepath", "file path", "file name", "filename", "파일 경로", "파일경로", "파일명", "파일 이름"],
+    "title": ["title", "song title", "제목", "곡명", "곡 제목", "노래 제목"],
+    "album": ["album", "앨범"],
+    "artist": ["artist", "singer", "아티스트", "가수"],
+    "genre": ["genre", "장르"],
+    "year": ["release year", "year", "발매 연도", "발매연도", "발매년도", "연도", "년도"],
+    "track": ["track number", "track", "트랙 번호", "트랙번호", "트랙"],
+    "comment": ["comment", "comments", "코멘트", "주석"],
+}
+
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+_ALIAS_PATTERN = "|".join(re.escape(alias) for alias in sorted(_ALIAS_TO_FIELD, key=len, reverse=True))
+
+MIN_YEAR = 1900
+MAX_YEAR_SPAN = 100
+
+_LEADING_FILLER = re.compile(
+    r"^(?:(?:find|show|list|get|search|search for)\s+)?(?:me\s+)?(?:all\s+)?(?:the\s+)?"
+    r"(?:(?:music|audio|mp3|m4a)\s+)?(?:files|songs|tracks|music)?\s*"
+    r"(?:with|where|whose|that have|having)?\s*(?:the\s+)?",
+    re.IGNORECASE,
+)
+_TRAILING_FILLER = re.compile(
+    r"(?:\s*(?:인|이신|에 발매된|발매된|에 나온|나온)?\s*(?:음악|노래|곡|음원|파일|트랙|music files|files|songs|tracks)(?:들)?\s*(?:을|를|은|는)?)?"
+    r"\s*(?:모두\s*)?(?:찾아\s*줘|찾아\s*주세요|검색해\s*줘|검색해\s*주세요|보여\s*줘|보여\s*주세요|알려\s*줘)?\s*[.?!]*$"
+)
+
+_BETWEEN = re.compile(r"\bbetween\s+(\d{4})\s+and\s+(\d{4})\b", re.IGNORECASE)
+_OR_SPLIT = re.compile(r"(?:\s+or\s+|(?<=\S)이거나\s+|\s+또는\s+|\s+혹은\s+)", re.IGNORECASE)
+_AND_SPLIT = re.compile(r"(?:\s+and\s+|(?<=\S)이고\s+|(?<=\S)이면서\s+|(?<=\S)이며\s+|\s+그리고\s+|\s*,\s*|\s*&\s*)", re.IGNORECASE)
+
+_YEAR_PREFIX = rf"(?:(?:{_ALIAS_PATTERN})\s*(?:이|가|은|는|:|=)?\s*)?"
+_YEAR_RANGE = re.compile(
+    _YEAR_PREFIX + r"(\d{4})\s*년?\s*(?:-|~|to|부터|에서)\s*(\d{4})\s*년?\s*(?:까지|사이)?$", re.IGNORECASE
+)
+_YEAR_AFTER = re.compile(_YEAR_PREFIX + r"(\d{4})\s*년?\s*(이후|부터|이상|초과|or later|and later|onwards)$", re.IGNORECASE)
+_YEAR_BEFORE = re.compile(_YEAR_PREFIX + r"(\d{4})\s*년?\s*(이전|까지|이하|미만|or earlier|and earlier)$", re.IGNORECASE)
+_YEAR_EN_PREFIX = re.compile(_YEAR_PREFIX + r"(after|since|before|until)\s+(\d{4})$", re.IGNORECASE)
+_YEAR_OPERATOR = re.compile(_YEAR_PREFIX + r"(>=|<=|>|<)\s*(\d{4})$", re.IGNORECASE)
+_YEAR_ONLY = re.compile(r"(\d{4})\s*년(?:도)?(?:\s*(?:에\s*)?(?:발매된|발매|나온))?$")
+
+_FIELD_CLAUSE = re.compile(
+    rf"^(?P<field>{_ALIAS_PATTERN})(?![A-Za-z])\s*(?:이|가|은|는|:|==|=|(?:is|equals|of)(?=\s))?\s*(?P<value>.+)$",
+    re.IGNORECASE,
+)
+_BY_ARTIST = re.compile(r"^by\s+(?P<value>.+)$", re.IGNORECASE)
+
+# 값 안에 남아 있으면 이해하지 못한 조건으로 보고 LLM에 넘김: "artist is not BTS", "genre Pop or Rock"
+_UNSUPPORTED_WORDS = re.compile(
+    r"\b(?:or|not|contains?|containing|like|after|before|since|until|from|released|starts?|starting|ends?|ending|"
+    r"without|except|excluding|between|than)\b|"
+    r"(?<!\S)(?:아닌|아니|제외|빼고|포함|들어간|들어가는|시작하는|시작되는|끝나는|이후|이전|이상|이하|또는|혹은)",
+    re.IGNORECASE,
+)
+_QUOTED = re.compile(r"^[\"“](.+)[\"”]$")
+
+# 수정 요청에서 검색 조건 부분만 추출: "장르가 Pop인 곡의 연도를 2020으로 바꿔줘"
+_EDIT_PATTERNS = [
+    re.compile(
+        rf"^(?P<selection>.+?)\s*(?:의|에서)\s+(?:{_ALIAS_PATTERN})\s*(?:을|를|은|는)?\s+.+?(?:으로|로)\s*"
+        r"(?:바꿔|변경|수정|업데이트|설정|지정|고쳐).*$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        rf"^(?:change|set|update|rename)\s+(?:the\s+)?(?:{_ALIAS_PATTERN})\s+(?:of|for)\s+(?P<selection>.+?)\s+to\s+.+$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        rf"^(?:change|set|update|rename)\s+(?:the\s+)?(?:{_ALIAS_PATTERN})\s+to\s+.+?\s+(?:for|of|on)\s+(?P<selection>.+)$",
+        re.IGNORECASE,
+    ),
+]
+_EDIT_WORDS = re.compile(
+    r"바꿔|변경|수정|업데이트|설정|지정|고쳐|삭제|지워|추가|\b(?:change|set|update|rename|replace|remove|delete|add)\b",
+    re.IGNORECASE,
+)
+
+
+def _year_range(low: int, high: int):
+    """
+    Year values are stored as strings, which Chroma cannot range-compare,
+    so a bounded range is expanded into an OR of exact matches.
+    """
+    if low > high or high - low > MAX_YEAR_SPAN:
+        return None
+    comparisons = [Comparison(comparator=Comparator.EQ, attribute="year", value=str(year)) for year in range(low, high + 1)]
+    if len(comparisons) == 1:
+        return comparisons[0]
+    return Operation(operator=Operator.OR, arguments=comparisons)
+
+
+def _parse_year_clause(text: str):
+    this_year = date.today().year
+
+    match = _YEAR_RANGE.match(text)
+    if match:
+        return _year_range(int(match.group(1)), int(match.group(2)))
+
+    match = _YEAR_AFTER.match(text)
+    if match:
+        year = int(match.group(1))
+        return _year_range(year + 1 if match.group(2) == "초과" else year, this_year)
+
+    match = _YEAR_BEFORE.match(text)
+    if match:
+        year = int(match.group(1))
+        return _year_range(MIN_YEAR, year - 1 if match.group(2) == "미만" else year)
+
+    match = _YEAR_EN_PREFIX.match(text)
+    if match:
+        word, year = match.group(1).lower(), int(match.group(2))
+        if word == "after":
+            return _year_range(year + 1, this_year)
+        if word == "since":
+            return _year_range(year, this_year)
+        if word == "before":
+            return _year_range(MIN_YEAR, year - 1)
+        return _year_range(MIN_YEAR, year)
+
+    match = _YEAR_OPERATOR.match(text)
+    if match:
+        operator, year = match.group(1), int(match.group(2))
+        if operator == ">":
+            return _year_range(year + 1, this_year)
+        if operator == ">=":
+            return _year_range(year, this_year)
+        if operator == "<":
+            return _year_range(MIN_YEAR, year - 1)
+        return _year_range(MIN_YEAR, year)
+
+    match = _YEAR_ONLY.match(text)
+    if match:
+        return _year_range(int(match.group(1)), int(match.group(1)))
+
+    return None
+
+
+def _clean_value(value: str) -> str | None:
+    """
+    The literal value of a clause, or None when it carries words the parser
+    does not understand (negation, substring, ranges, ...). Only a fully
+    quoted value is taken verbatim.
+    """
+    value = value.strip()
+    quoted = _QUOTED.match(value)
+    if quoted:
+        return quoted.group(1).strip() or None
+    value = value.strip("\"'“”‘’`").strip()
+    if not value or re.search(rf"^(?:{_ALIAS_PATTERN})$", value, re.IGNORECASE):
+        return None
+    if _UNSUPPORTED_WORDS.search(value):
+        return None
+    return value
+
+
+def _parse_clause(text: str):
+    text = text.strip()
+    if not text:
+        return None
+
+    year_filter = _parse_year_clause(text)
+    if year_filter is not None:
+        return year_filter
+
+    match = _FIELD_CLAUSE.match(text)
+    if match:
+        field = _ALIAS_TO_FIELD[match.group("field").lower()]
+        value = _clean_value(match.group("value"))
+        if value is None:
+            return None
+        return Comparison(comparator=Comparator.EQ, attribute=field, value=value)
+
+    match = _BY_ARTIST.match(text)
+    if match:
+        value = _clean_value(match.group("value"))
+        if value is None:
+            return None
+        return Comparison(comparator=Comparator.EQ, attribute="artist", value=value)
+
+    return None
+
+
+def _parse_joined(text: str, splitter: re.Pattern, parse_part, operator: Operator):
+    """
+    Split text on splitter and parse every part. A part that does not parse on
+    its own is glued back onto the previous one, so values such as
+    "Simon and Garfunkel" survive the split.
+    """
+    pieces = []
+    position = 0
+    for match in splitter.finditer(text):
+        pieces.append((text[position:match.start()], text[match.start():match.end()]))
+        position = match.end()
+    pieces.append((text[position:], ""))
+
+    parts = []
+    current = ""
+    for piece, separator in pieces:
+        if current and parse_part(piece) is not None:
+            parts.append(current)
+            current = piece
+        else:
+            current += piece
+        current += separator
+    parts.append(current)
+
+    parsed = []
+    for part in parts:
+        result = parse_part(_strip_separator(part, splitter))
+        if result is None:
+            return None
+        parsed.append(result)
+
+    if len(parsed) == 1:
+        return parsed[0]
+    return Operation(operator=operator, arguments=parsed)
+
+
+def _strip_separator(text: str, splitter: re.Pattern) -> str:
+    match = None
+    for match in splitter.finditer(text):
+        pass
+    if match is not None and match.end() == len(text):
+        return text[:match.start()]
+    return text
+
+
+def _parse_and(text: str):
+    return _parse_joined(text, _AND_SPLIT, _parse_clause, Operator.AND)
+
+
+def _parse_or(text: str):
+    return _parse_joined(text, _OR_SPLIT, _parse_and, Operator.OR)
+
+
+def parse_query(query: str) -> StructuredQuery | None:
+    """
+    Rule-based parser for the common query shapes ("genre Pop", "아티스트가
+    아이유인 곡", "2010년부터 2015년까지", simple AND/OR over the metadata
+    fields). Returns None when the input is not fully understood, in which
+    case the LLM query constructor should be used instead.
+    """
+    text = re.sub(r"\s+", " ", query).strip()
+    for pattern in _EDIT_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            text = match.group("selection")
+            break
+    if _EDIT_WORDS.search(text):
+        return None
+
+    text = _BETWEEN.sub(r"\1-\2", text)
+    text = _LEADING_FILLER.sub("", text, count=1)
+    text = _TRAILING_FILLER.sub("", text, count=1).strip()
+    if not text:
+        return None
+
+    query_filter = _parse_or(text)
+    if query_filter is None:
+        return None
+    return StructuredQuery(query="", filter=query_filter, limit=None)
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+
+
+RESULT_SET_PATH = ".cache/result_sets.db"
+
+# Same default as CHECKPOINT_MAX_AGE: a handle lives at least as long as a thread that may still reference it
+RESULT_SET_MAX_AGE = float(os.getenv("RESULT_SET_MAX_AGE", str(7 * 86400)))
+
+
+class ResultSetRegistry:
+    """
+    Server-side store of retrieval results. The conversation only carries a
+    short handle; tools resolve it back to the full filepath list. Backed by
+    SQLite so handles in pending tool calls survive a restart. Sets are
+    evicted by age (max_age seconds since last use), not by count, so busy
+    sessions cannot push out a handle another session's approval still needs.
+    """
+
+    def __init__(self, db_path: str = RESULT_SET_PATH, max_age: float = RESULT_SET_MAX_AGE):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_sets "
+            "(handle TEXT PRIMARY KEY, query TEXT, created REAL NOT NULL, filepaths TEXT NOT NULL, last_used REAL)"
+        )
+        try:
+            # Stores created before last_used existed
+            self._conn.execute("ALTER TABLE result_sets ADD COLUMN last_used REAL")
+        except sqlite3.OperationalError:
+            pass
+        self._conn.execute("CREATE INDEX IF NOT EXISTS result_sets_last_used ON result_sets (last_used)")
+        self._conn.commit()
+
+    def register(self, filepaths: list[str], query: str | None = None) -> str:
+        handle = f"rs-{uuid4().hex[:10]}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO result_sets (handle, query, created, filepaths, last_used) VALUES (?, ?, ?, ?, ?)",
+                (handle, query, now, json.dumps(filepaths, ensure_ascii=False), now),
+            )
+            self._conn.execute(
+                "DELETE FROM result_sets WHERE COALESCE(last_used, created) < ?", (now - self.max_age,)
+            )
+            self._conn.commit()
+        return handle
+
+    def get(self, handle: str) -> list[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT filepaths FROM result_sets WHERE handle = ?", (handle.strip(),)).fetchone()
+            if row is not None:
+                # Resolving (approval review, execution) keeps the set alive
+                self._conn.execute("UPDATE result_sets SET last_used = ? WHERE handle = ?", (time.time(), handle.strip()))
+                self._conn.commit()
+        if row is None:
+            raise KeyError(f"알 수 없는 result_set입니다: {handle}")
+        return json.loads(row[0])
+
+    def describe(self, handle: str, preview: int = 10) -> dict:
+        filepaths = self.get(handle)
+        return {"result_set": handle, "total": len(filepaths), "preview": filepaths[:preview]}
+
+
+result_sets = None
+
+
+def get_result_sets() -> ResultSetRegistry:
+    global result_sets
+    if result_sets is None:
+        result_sets = ResultSetRegistry()
+    return result_sets
+
+
+def register_result_set(filepaths: list[str], query: str | None = None) -> str:
+    return get_result_sets().register(filepaths, query)
+
+
+def resolve_result_set(handle: str) -> list[str]:
+    return get_result_sets().get(handle)
@@ -0,0 +1,173 @@
+from typing import Any
+
+from langchain.retrievers.self_query.base import SelfQueryRetriever
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.structured_query import Comparator, Comparison, Operation, StructuredQuery
+
+from utils.audio_tag_editor import metadata_to_document
+from utils.fuzzy_index import FUZZY_FIELDS, romanize
+from utils.query_parser import parse_query
+
+
+CORRECTION_MIN_SCORE = 0.75
+CORRECTION_MARGIN = 0.1
+CORRECTION_MAX_LENGTH_RATIO = 1.34
+
+# Document metadata key carrying the spelling correction applied to the filter
+CORRECTION_KEY = "_correction"
+
+
+def _comparable_length(a: str, b: str) -> bool:
+    # Romanized, so Hangul and Latin spellings are measured alike
+    a, b = len(romanize(a)), len(romanize(b))
+    return min(a, b) > 0 and max(a, b) / min(a, b) <= CORRECTION_MAX_LENGTH_RATIO
+
+
+class FastSelfQueryRetriever(SelfQueryRetriever):
+    """
+    SelfQueryRetriever that first tries the local rule-based parser, then the
+    structured query cache, and only calls the LLM query constructor when
+    neither has an answer. Pure metadata filters are answered from the
+    in-memory MetadataIndex; Chroma is only searched when the structured query
+    carries text that needs semantic similarity.
+    """
+
+    query_cache: Any = None
+    """Optional StructuredQueryCache for LLM-constructed queries."""
+    metadata_index: Any = None
+    """Optional MetadataIndex for filter-only queries."""
+    fuzzy_index: Any = None
+    """Optional FuzzyIndex used to correct misspelled names when a filter finds nothing."""
+
+    def _lookup_structured_query(self, query: str) -> StructuredQuery | None:
+        structured_query = parse_query(query)
+        if structured_query is None and self.query_cache is not None:
+            structured_query = self.query_cache.get(query)
+        return structured_query
+
+    def _remember_structured_query(self, query: str, structured_query: StructuredQuery):
+        if self.query_cache is not None:
+            self.query_cache.put(query, structured_query)
+
+    def _search_index(self, structured_query: StructuredQuery) -> list[Document] | None:
+        if self.metadata_index is None or (structured_query.query or "").strip():
+            return None
+        corrections = []
+        try:
+            records = self.metadata_index.search(structured_query.filter, limit=structured_query.limit)
+            if not records and self.fuzzy_index is not None and structured_query.filter is not None:
+                corrected = self._correct_filter(structured_query.filter, corrections)
+                if corrected is not structured_query.filter:
+                    if self.verbose:
+                        print(f"Corrected filter: {corrected}")
+                    records = self.metadata_index.search(corrected, limit=structured_query.limit)
+        except ValueError:
+            # 인덱스가 처리할 수 없는 필터는 Chroma로 넘김
+            return None
+        docs = [metadata_to_document(dict(record)) for record in records]
+        if corrections:
+            # 보정 내용을 결과와 함께 전달해 사용자에게 알림
+            note = ", ".join(corrections)
+            for doc in docs:
+                doc.metadata[CORRECTION_KEY] = note
+        return docs
+
+    def _correct_filter(self, node, corrections: list[str]):
+        """
+        Replace equality values on name fields that match nothing with the
+        closest existing value from the fuzzy index, appending a description
+        of each replacement to corrections. Returns node itself when nothing
+        was corrected.
+        """
+        if isinstance(node, Operation):
+            arguments = [self._correct_filter(argument, corrections) for argument in node.arguments]
+            if all(new is old for new, old in zip(arguments, node.arguments)):
+                return node
+            return Operation(operator=node.operator, arguments=arguments)
+
+        if (
+            isinstance(node, Comparison)
+            and node.comparator == Comparator.EQ
+            and node.attribute in FUZZY_FIELDS
+            and not self.metadata_index.eq(node.attribute, node.value)
+        ):
+            value = self._best_correction(node.attribute, str(node.value))
+            if value is not None:
+                corrections.append(f"{node.attribute} '{node.value}' → '{value}'")
+                return Comparison(comparator=Comparator.EQ, attribute=node.attribute, value=value)
+        return node
+
+    def _best_correction(self, field: str, text: str) -> str | None:
+        """
+        The existing value that text most likely misspells, or None. Only
+        values of comparable length qualify (so "not BTS" or "IU or BTS" never
+        becomes "BTS"), the score must clear CORRECTION_MIN_SCORE and the best
+        candidate must beat the runner-up by CORRECTION_MARGIN.
+        """
+        candidates = [
+            (value, score)
+            for _, value, score in self.fuzzy_index.search(text, fields=[field], min_score=CORRECTION_MIN_SCORE)
+            if _comparable_length(text, str(value)) and self.metadata_index.eq(field, value)
+        ]
+        if not candidates:
+            return None
+        if len(candidates) > 1 and candidates[0][1] - candidates[1][1] < CORRECTION_MARGIN:
+            return None
+        return candidates[0][0]
+
+    def _get_structured_query(self, query: str, run_manager: CallbackManagerForRetrieverRun | None = None) -> StructuredQuery:
+        structured_query = self._lookup_structured_query(query)
+        if structured_query is None:
+            structured_query = self.query_constructor.invoke(
+                {"query": query}, config={"callbacks": run_manager.get_child() if run_manager else None}
+            )
+            self._remember_structured_query(query, structured_query)
+        if self.verbose:
+            print(f"Generated Query: {structured_query}")
+        return structured_query
+
+    async def _aget_structured_query(self, query: str, run_manager: AsyncCallbackManagerForRetrieverRun | None = None) -> StructuredQuery:
+        structured_query = self._lookup_structured_query(query)
+        if structured_query is None:
+            structured_query = await self.query_constructor.ainvoke(
+                {"query": query}, config={"callbacks": run_manager.get_child() if run_manager else None}
+            )
+            self._remember_structured_query(query, structured_query)
+        if self.verbose:
+            print(f"Generated Query: {structured_query}")
+        return structured_query
+
+    def build_structured_query(self, query: str) -> StructuredQuery:
+        """
+        Translate query into a structured query (parser, cache or LLM). Touches
+        neither the metadata index nor Chroma, so callers can run it without
+        holding the index lock.
+        """
+        return self._get_structured_query(query)
+
+    async def abuild_structured_query(self, query: str) -> StructuredQuery:
+        """Async build_structured_query()."""
+        return await self._aget_structured_query(query)
+
+    def search_structured(self, query: str, structured_query: StructuredQuery) -> list[Document]:
+        """Documents matching an already built structured query (metadata index or Chroma)."""
+        docs = self._search_index(structured_query)
+        if docs is not None:
+            return docs
+        new_query, search_kwargs = self._prepare_query(query, structured_query)
+        return self._get_docs_with_query(new_query, search_kwargs)
+
+    async def asearch_structured(self, query: str, structured_query: StructuredQuery) -> list[Document]:
+        """Async search_structured()."""
+        docs = self._search_index(structured_query)
+        if docs is not None:
+            return docs
+        new_query, search_kwargs = self._prepare_query(query, structured_query)
+        return await self._aget_docs_with_query(new_query, search_kwargs)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.search_structured(query, self._get_structured_query(query, run_manager))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        return await self.asearch_structured(query, await self._aget_structured_query(query, run_manager))
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+CATALOG_PATH = ".cache/tag_catalog.db"
+
+METADATA_FIELDS = ["title", "album", "artist", "genre", "year", "track", "comment", "album_artist"]
+
+
+class TagCatalog:
+    """
+    On-disk catalog of audio tags keyed by filepath, with the mtime/size of the
+    file at the time its tags were read. Used to rescan only new or modified files.
+    """
+
+    def __init__(self, db_path: str = CATALOG_PATH):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{field} TEXT" for field in METADATA_FIELDS)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS tags ("
+            f"filepath TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, {columns})"
+        )
+        self._conn.commit()
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """Return {filepath: (mtime_ns, size)} for every catalogued file."""
+        with self._lock:
+            rows = self._conn.execute("SELECT filepath, mtime_ns, size FROM tags").fetchall()
+        return {filepath: (mtime_ns, size) for filepath, mtime_ns, size in rows}
+
+    def diff(self, current: dict[str, tuple[int, int]]) -> tuple[list[str], list[str]]:
+        """
+        Compare the current {filepath: (mtime_ns, size)} listing with the catalog.
+        Returns (new or modified filepaths, filepaths that no longer exist).
+        """
+        stored = self.stats()
+        changed = [filepath for filepath, stat in current.items() if stored.get(filepath) != stat]
+        deleted = [filepath for filepath in stored if filepath not in current]
+        return changed, deleted
+
+    def upsert(self, records: list[dict], stats: dict[str, tuple[int, int]]):
+        rows = []
+        for record in records:
+            mtime_ns, size = stats[record["filepath"]]
+            rows.append([record["filepath"], mtime_ns, size] + [_to_text(record.get(field)) for field in METADATA_FIELDS])
+        if not rows:
+            return
+
+        placeholders = ", ".join("?" for _ in range(3 + len(METADATA_FIELDS)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO tags (filepath, mtime_ns, size, {', '.join(METADATA_FIELDS)}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, filepaths: list[str]):
+        if not filepaths:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM tags WHERE filepath = ?", [(filepath,) for filepath in filepaths])
+            self._conn.commit()
+
+    def update_fields(self, filepath: str, fields: dict):
+        """
+        Write-through for tag edits: store the new field values together with the
+        file's post-save mtime/size, so the edit is not picked up as a change on
+        the next rescan.
+        """
+        fields = {field: value for field, value in fields.items() if field in METADATA_FIELDS}
+        mtime_ns, size = file_stat(filepath)
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        values = [_to_text(value) for value in fields.values()]
+
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE tags SET mtime_ns = ?, size = ?{', ' if assignments else ''}{assignments} WHERE filepath = ?",
+                [mtime_ns, size] + values + [filepath],
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def get(self, filepath: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT filepath, {', '.join(METADATA_FIELDS)} FROM tags WHERE filepath = ?", (filepath,)
+            ).fetchone()
+        return _to_record(row) if row else None
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT filepath, {', '.join(METADATA_FIELDS)} FROM tags").fetchall()
+        return [_to_record(row) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def file_stat(filepath: str) -> tuple[int, int]:
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _to_text(value):
+    return None if value is None else str(value)
+
+
+def _to_record(row) -> dict:
+    return dict(zip(["filepath"] + METADATA_FIELDS, row))
+
+
+catalog = None
+
+
+def init_catalog(db_path: str = CATALOG_PATH) -> TagCatalog:
+    global catalog
+    catalog = TagCatalog(db_path)
+    return catalog
+
+
+def get_catalog() -> TagCatalog | None:
+    return catalog
@@ -0,0 +1,163 @@
+import re
+from pathlib import Path
+from string import Formatter
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from utils.tag_catalog import METADATA_FIELDS
+
+
+PLACEHOLDERS = METADATA_FIELDS + [
+    "filename", "filename_stem", "extension", "folder", "track_number", "track_total", "year4",
+]
+
+# Numeric placeholders may be zero-padded to a small width ({track_number:02d}); no other format specs
+NUMERIC_PLACEHOLDERS = {"track_number", "track_total"}
+_NUMBER_SPEC = re.compile(r"0?[1-9]?d")
+
+MAX_TEMPLATE_LENGTH = 200
+MAX_PATTERN_LENGTH = 200
+# Quantifiers per pattern; with nesting forbidden and the input capped, backtracking stays polynomial and small
+MAX_PATTERN_REPEATS = 3
+MAX_PATTERN_INPUT_LENGTH = 100
+# Longest value a template or substitution may produce
+MAX_VALUE_LENGTH = 200
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT} | (
+    {sre_parse.POSSESSIVE_REPEAT} if hasattr(sre_parse, "POSSESSIVE_REPEAT") else set()
+)
+
+
+class TransformError(ValueError):
+    pass
+
+
+def validate_template(template: str):
+    """
+    Only placeholders from PLACEHOLDERS are allowed, plain ({title}) or, for
+    numeric ones, zero-padded to at most 9 digits ({track_number:02d}).
+    """
+    if len(template) > MAX_TEMPLATE_LENGTH:
+        raise TransformError(f"템플릿이 너무 깁니다 (최대 {MAX_TEMPLATE_LENGTH}자)")
+    try:
+        parsed = list(Formatter().parse(template))
+    except ValueError as e:
+        raise TransformError(f"잘못된 템플릿입니다: {e}")
+    for _, field_name, format_spec, conversion in parsed:
+        if field_name is None:
+            continue
+        if field_name not in PLACEHOLDERS:
+            raise TransformError(f"지원하지 않는 placeholder입니다: {{{field_name}}} (사용 가능: {', '.join(PLACEHOLDERS)})")
+        if conversion is not None or (format_spec and not (
+            field_name in NUMERIC_PLACEHOLDERS and _NUMBER_SPEC.fullmatch(format_spec)
+        )):
+            raise TransformError(
+                f"지원하지 않는 형식입니다: {{{field_name}:{format_spec}}} "
+                f"(숫자 placeholder의 자리수 지정만 가능, 예: {{track_number:02d}})"
+            )
+
+
+def _check_pattern(parsed, in_repeat: bool = False) -> int:
+    """
+    Reject constructs that can backtrack exponentially (a quantifier or an
+    alternation inside a quantifier, backreferences); returns the number of
+    quantifiers.
+    """
+    repeats = 0
+    for op, av in parsed:
+        if op in _REPEATS:
+            if in_repeat:
+                raise TransformError("중첩된 반복(예: (a+)+)은 사용할 수 없습니다")
+            repeats += 1 + _check_pattern(av[2], True)
+        elif op == sre_parse.BRANCH:
+            if in_repeat:
+                raise TransformError("반복 안의 선택(예: (a|b)*)은 사용할 수 없습니다")
+            repeats += sum(_check_pattern(branch, in_repeat) for branch in av[1])
+        elif op == sre_parse.SUBPATTERN:
+            repeats += _check_pattern(av[-1], in_repeat)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            repeats += _check_pattern(av[1], in_repeat)
+        elif op == getattr(sre_parse, "ATOMIC_GROUP", None):
+            repeats += _check_pattern(av, in_repeat)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise TransformError("역참조는 사용할 수 없습니다")
+    return repeats
+
+
+def compile_pattern(pattern: str) -> re.Pattern:
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise TransformError(f"정규식이 너무 깁니다 (최대 {MAX_PATTERN_LENGTH}자)")
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        raise TransformError(f"잘못된 정규식입니다: {e}")
+    # Python's re has no timeout, so patterns are limited to ones with bounded backtracking
+    if _check_pattern(sre_parse.parse(pattern)) > MAX_PATTERN_REPEATS:
+        raise TransformError(f"반복 기호가 너무 많습니다 (최대 {MAX_PATTERN_REPEATS}개)")
+    return compiled
+
+
+def _check_length(value: str, limit: int = MAX_VALUE_LENGTH):
+    if len(value) > limit:
+        raise TransformError(f"값이 너무 깁니다 (최대 {limit}자)")
+
+
+def _number(value, index: int):
+    # "3/12" -> 3 (index 0), 12 (index 1)
+    if value is None:
+        return None
+    parts = str(value).split("/")
+    if len(parts) <= index:
+        return None
+    match = re.match(r"\s*(\d+)", parts[index])
+    return int(match.group(1)) if match else None
+
+
+def _year4(value) -> str:
+    match = re.match(r"\s*(\d{4})", str(value or ""))
+    return match.group(1) if match else ""
+
+
+def placeholder_values(record: dict) -> dict:
+    path = Path(record["filepath"])
+    values = {field: record.get(field) or "" for field in METADATA_FIELDS}
+    values.update({
+        "filename": path.name,
+        "filename_stem": path.stem,
+        "extension": path.suffix.lstrip("."),
+        "folder": path.parent.name,
+        "track_number": _number(record.get("track"), 0) or 0,
+        "track_total": _number(record.get("track"), 1) or 0,
+        "year4": _year4(record.get("year")),
+    })
+    return values
+
+
+def render_value(record: dict, field: str, template: str | None = None,
+                 pattern: re.Pattern | None = None, replacement: str = "") -> str | None:
+    """
+    New value for field: the template rendered against the record (or the
+    current value when there is no template), then the regex substitution.
+    None when the result is empty, so a missing placeholder never writes a
+    blank tag.
+    """
+    value = record.get(field)
+    if template is not None:
+        try:
+            value = template.format_map(placeholder_values(record))
+        except (ValueError, TypeError) as e:
+            raise TransformError(f"템플릿 적용 실패: {e}")
+    if pattern is not None and value is not None:
+        value = str(value)
+        _check_length(value, MAX_PATTERN_INPUT_LENGTH)
+        try:
+            value = pattern.sub(replacement, value)
+        except re.error as e:
+            raise TransformError(f"치환 실패: {e}")
+    if isinstance(value, str):
+        value = value.strip()
+        _check_length(value)
+    return value or None
@@ -1,23 +1,50 @@
 from utils.audio_tag_editor import *
+from utils.tag_catalog import CATALOG_PATH, init_catalog
+from utils.embedding_cache import CachedEmbeddings
 
 from langchain_ollama import OllamaEmbeddings
 
 from langchain.chains.query_constructor.base import AttributeInfo
-from langchain.retrievers.self_query.base import SelfQueryRetriever
+from utils.self_query import FastSelfQueryRetriever
+from utils.query_cache import QUERY_CACHE_PATH, StructuredQueryCache
+from utils.metadata_index import init_metadata_index
+from utils.fuzzy_index import init_fuzzy_index
+from utils.locks import index_lock
 
 
-def init_vector_store(folder_path: str, llm):
+EMBEDDING_MODEL = "bona/bge-m3-korean"
+
+
+def init_vector_store(folder_path: str, llm, catalog_path: str = CATALOG_PATH, persist_directory: str = VECTOR_STORE_PATH):
+    # Sessions share one index; searches wait while it is (re)built
+    with index_lock.write():
+        _init_vector_store(folder_path, llm, catalog_path, persist_directory)
+        # Tags may have changed on disk, so results cached against the old index are stale
+        bump_write_generation()
+
+
+def _init_vector_store(folder_path: str, llm, catalog_path: str, persist_directory: str):
     global vector_store
     global retriever
     
+    catalog = init_catalog(catalog_path)
+    
     # embeddings = AzureOpenAIEmbeddings(
     #     azure_endpoint="https://ai-593601083ai249546569384.cognitiveservices.azure.com/",
     #     azure_deployment="text-embedding-3-large",
     #     openai_api_version="2024-02-01"
     #     )
-    embeddings = OllamaEmbeddings(model="bona/bge-m3-korean")
-    vector_store = store_metadata_in_vector_store(folder_path=folder_path, embeddings=embeddings)
-    num_vectors = len(vector_store.get()["ids"])
+    # Cached by model + text hash, so rebuilds and repeated queries skip Ollama
+    embeddings = CachedEmbeddings(OllamaEmbeddings(model=EMBEDDING_MODEL), model_name=EMBEDDING_MODEL)
+    # Persisted collection: only the delta against the stored ids is embedded.
+    # Only new or modified files are re-read, and they stream from the scanner into
+    # the embedding pipeline; unchanged tags come from the catalog
+    vector_store = open_vector_store(embeddings, persist_directory=persist_directory)
+    sync_vector_store(vector_store, iter_sync_catalog(catalog, folder_path))
+    metadata_list = catalog.records()
+    metadata_index = init_metadata_index(metadata_list)
+    fuzzy_index = init_fuzzy_index(metadata_list)
+    num_vectors = len(metadata_list)
     
     metadata_field_info  = [
         AttributeInfo(name="filepath", description="Audio file name", type="string"),
@@ -32,7 +59,8 @@ def init_vector_store(folder_path: str, llm):
     ]
     document_contents = "metadata of audio files"
     
-    retriever = SelfQueryRetriever.from_llm(
+    # Common query shapes are parsed locally; the LLM is only used as a fallback
+    retriever = FastSelfQueryRetriever.from_llm(
         llm=llm,
         vectorstore=vector_store,
         document_contents=document_contents,
@@ -40,7 +68,10 @@ def init_vector_store(folder_path: str, llm):
         search_kwargs={"k": num_vectors},
         enable_limit=True,
         verbose=True,
-        score_threshold=1.0
+        score_threshold=1.0,
+        query_cache=StructuredQueryCache(path=QUERY_CACHE_PATH),
+        metadata_index=metadata_index,
+        fuzzy_index=fuzzy_index
     )
     
 def init_vector_store_as_content(folder_path: str, llm):